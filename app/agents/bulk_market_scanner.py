@@ -0,0 +1,208 @@
+# File: app/agents/bulk_market_scanner.py
+# Author: MCP Development Core
+# Description: Scans a grid of niches and locations for opportunities, pipelining the analysis stages.
+
+import os
+import asyncio
+from typing import AsyncIterator, List, Optional, Set
+
+# Import the stages of the single-market analysis
+from app.agents.market_opportunity_finder import (
+    SCRAPE_DEADLINE_SECONDS,
+    SCRAPE_PER_HOST_LIMIT,
+    build_search_query,
+    heuristic_result,
+    score_opportunities_batch,
+    select_competitor_urls,
+    with_llm_scoring
+)
+from app.agents.tools.google_search import google_search_tool_async
+from app.agents.tools.competitor_analysis import CompetitorScraper
+from app.metrics import track_stage
+
+# Each stage has its own concurrency limit, so a slow stage queues its own work without
+# holding up the others: while one market is being scored, the next ones are already
+# searching and scraping.
+BULK_SEARCH_CONCURRENCY = int(os.getenv("BULK_SEARCH_CONCURRENCY", "4"))
+BULK_SCRAPE_CONCURRENCY = int(os.getenv("BULK_SCRAPE_CONCURRENCY", "20"))
+BULK_LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", "4"))
+# Markets ready for scoring are sent to Gemini together, up to this many per call. A batch
+# is sent once it is full or its oldest market has waited BULK_SCORING_BATCH_WAIT_SECONDS.
+# A batch size of 1 scores every market with its own call.
+BULK_SCORING_BATCH_SIZE = int(os.getenv("BULK_SCORING_BATCH_SIZE", "5"))
+BULK_SCORING_BATCH_WAIT_SECONDS = float(os.getenv("BULK_SCORING_BATCH_WAIT_SECONDS", "0.5"))
+# The largest grid (niches x locations) a single scan accepts.
+BULK_MAX_MARKETS = int(os.getenv("BULK_MAX_MARKETS", "500"))
+
+
+def build_market_grid(niches: List[str], locations: List[str]) -> List[tuple]:
+    """Returns every (niche, location) pair once, in grid order, ignoring blanks and repeats."""
+    niches = list(dict.fromkeys(niche.strip() for niche in niches if niche.strip()))
+    locations = list(dict.fromkeys(location.strip() for location in locations if location.strip()))
+    return [(niche, location) for niche in niches for location in locations]
+
+
+class ScoringBatcher:
+    """
+    Collects markets that are ready to be scored and scores them in batched Gemini calls.
+
+    `score()` returns once the market's batch has been scored. At most `llm_limit`
+    batches are in flight at a time.
+    """
+
+    def __init__(self, llm_limit: asyncio.Semaphore, batch_size: int, max_wait: float, regenerate: bool):
+        self.llm_limit = llm_limit
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.regenerate = regenerate
+        self.calls = 0
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def score(self, niche: str, location: str, analysis_data: list) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((niche, location, analysis_data, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            task = asyncio.create_task(self._score_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _score_batch(self, batch: List[tuple]):
+        futures = [future for *_, future in batch]
+        try:
+            async with self.llm_limit:
+                with track_stage("bulk_analyze", "score") as span:
+                    self.calls += 1
+                    markets = [(niche, location, analysis_data) for niche, location, analysis_data, _ in batch]
+                    results = await score_opportunities_batch(markets, self.regenerate)
+                    if any("error" in result for result in results):
+                        span.fail()
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def close(self):
+        """Cancels any batch still being scored."""
+        if self._timer is not None:
+            self._timer.cancel()
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+
+async def _analyze_market(
+    niche: str,
+    location: str,
+    scraper: CompetitorScraper,
+    search_limit: asyncio.Semaphore,
+    batcher: ScoringBatcher,
+    force_llm: bool
+) -> dict:
+    """Runs one market through search, scrape and score, waiting for a slot at each stage."""
+    async with search_limit:
+        with track_stage("bulk_analyze", "search") as span:
+            competitors = await google_search_tool_async(build_search_query(niche, location))
+            if not competitors:
+                span.fail()
+    if not competitors:
+        return {"error": "Could not find any competitors in the initial Google search."}
+
+    urls = select_competitor_urls(competitors)
+    with track_stage("bulk_analyze", "scrape") as span:
+        results = await asyncio.gather(*(scraper.analyze(url) for url in urls))
+        analysis_data = [result for result in results if "error" not in result]
+        if not analysis_data:
+            span.fail()
+    if not analysis_data:
+        return {"error": "Could not successfully analyze any competitor websites."}
+
+    # Clear-cut markets are scored locally and never reach the Gemini batches.
+    result, heuristic = heuristic_result(niche, location, analysis_data, force_llm=force_llm)
+    if result is not None:
+        return result
+    return with_llm_scoring(await batcher.score(niche, location, analysis_data), heuristic)
+
+
+async def scan_markets(
+    niches: List[str],
+    locations: List[str],
+    regenerate: bool = False,
+    force_llm: bool = False,
+    search_concurrency: int = BULK_SEARCH_CONCURRENCY,
+    scrape_concurrency: int = BULK_SCRAPE_CONCURRENCY,
+    llm_concurrency: int = BULK_LLM_CONCURRENCY,
+    scoring_batch_size: int = BULK_SCORING_BATCH_SIZE
+) -> AsyncIterator[dict]:
+    """
+    Analyzes every niche x location market, yielding each result as soon as it is ready.
+
+    Competitor pages are shared across markets: a URL that shows up in several searches
+    is fetched once, and markets are scored `scoring_batch_size` at a time per Gemini call.
+    Yields events as dictionaries with "event" and "data" keys:
+      - "result": one market's analysis, as returned by `analyze_market_opportunity`
+        (always including "niche" and "location", also for errors).
+      - "done": the number of markets, how many failed, how many pages were fetched and
+        how many Gemini scoring calls were made.
+
+    Closing the generator early cancels the markets still in progress.
+    """
+    markets = build_market_grid(niches, locations)
+    print(f"--- Starting bulk scan of {len(markets)} markets ---")
+
+    search_limit = asyncio.Semaphore(search_concurrency)
+    batcher = ScoringBatcher(
+        asyncio.Semaphore(llm_concurrency), scoring_batch_size, BULK_SCORING_BATCH_WAIT_SECONDS, regenerate
+    )
+
+    async with CompetitorScraper(
+        max_concurrency=scrape_concurrency,
+        per_host_limit=SCRAPE_PER_HOST_LIMIT,
+        timeout=SCRAPE_DEADLINE_SECONDS
+    ) as scraper:
+        async def run(niche: str, location: str) -> dict:
+            try:
+                result = await _analyze_market(niche, location, scraper, search_limit, batcher, force_llm)
+            except Exception as e:
+                print(f"  > Scan of {niche} in {location} failed: {e!r}")
+                result = {"error": "An unexpected error occurred."}
+            return {"niche": niche, "location": location, **result}
+
+        tasks = [asyncio.create_task(run(niche, location)) for niche, location in markets]
+        failed = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if "error" in result:
+                    failed += 1
+                print(f"  > Finished {result['niche']} in {result['location']}")
+                yield {"event": "result", "data": result}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await batcher.close()
+
+    scrape_stats = scraper.stats()
+    yield {"event": "done", "data": {
+        "markets": len(markets),
+        "failed": failed,
+        "pages_fetched": scrape_stats["unique_urls"],
+        "pages_shared": scrape_stats["requests"] - scrape_stats["unique_urls"],
+        "scoring_calls": batcher.calls
+    }}
@@ -3,81 +3,361 @@
 # Description: The main agent that generates and pushes content to a headless CMS.
 
 import os
-from typing import Optional, Dict
+import json
+import asyncio
+import hashlib
+from typing import AsyncIterator, Callable, Optional, Dict
 
 # Import the tools we built
-from app.agents.tools.content_generation import generate_page_content_tool
+from app.agents.tools.content_generation import (
+    generate_page_content_tool_async,
+    stream_page_content_tool_async,
+    fallback_page_content
+)
 # CORRECTED: Import the new Sanity.io tool
-from app.agents.tools.sanity_tool import sanity_tool_create_documents
+from app.agents.tools.sanity_tool import sanity_tool_mutate, sanity_tool_query
+from app.metrics import instrumented_pipeline, track_stage
+from app.single_flight import SingleFlight
 
 
-def generate_content_for_editing(business_name: str, niche: str, location: str) -> dict:
-    """
-    Generates the initial HTML content for all site pages for user review.
-    """
-    print(f"--- Stage 1: Generating initial content for '{business_name}' ---")
-    
-    site_structure = {
+# Page generation limits: pages are generated in parallel, each with its own timeout.
+PAGE_GENERATION_CONCURRENCY = int(os.getenv("PAGE_GENERATION_CONCURRENCY", "4"))
+PAGE_GENERATION_TIMEOUT_SECONDS = float(os.getenv("PAGE_GENERATION_TIMEOUT_SECONDS", "60"))
+
+# Identical generation requests that overlap share one run, and the generated pages are
+# served to identical requests for this many seconds. Set to 0 to only share in-flight runs.
+GENERATION_RETAIN_SECONDS = float(os.getenv("GENERATION_RETAIN_SECONDS", "30"))
+# Only runs where every page was generated are kept; a retry should try the failed pages again.
+generation_flights = SingleFlight(
+    "generate",
+    retain_seconds=GENERATION_RETAIN_SECONDS,
+    should_retain=lambda result: not result["failed_pages"]
+)
+
+
+def _normalize_input(value: str) -> str:
+    # Case is kept: the business name and niche are written into the pages as given.
+    return " ".join(value.split())
+
+
+def build_site_structure(niche: str) -> Dict[str, Dict[str, str]]:
+    """Returns the pages every generated site starts with, keyed by filename."""
+    return {
         "index.html": {"topic": "Home Page", "title": "Home"},
         "about.html": {"topic": "About Us", "title": "About Us"},
         "services.html": {"topic": f"Our {niche} Services", "title": "Services"},
         "contact.html": {"topic": "Contact Us", "title": "Contact Us"}
     }
+
+
+async def generate_content_for_editing(
+    business_name: str,
+    niche: str,
+    location: str,
+    max_concurrency: int = PAGE_GENERATION_CONCURRENCY,
+    page_timeout: float = PAGE_GENERATION_TIMEOUT_SECONDS,
+    regenerate: bool = False
+) -> dict:
+    """
+    Generates the initial HTML content for all site pages for user review.
+
+    The Gemini calls for the pages run concurrently (at most `max_concurrency` at a time),
+    so the total time is close to a single call. A page that fails or times out gets
+    placeholder content and is listed in `failed_pages`; the other pages are kept.
+    Pages already generated for the same inputs come from the LLM cache unless
+    `regenerate` is set.
+
+    Concurrent calls with the same inputs share a single run, and its result is reused
+    for GENERATION_RETAIN_SECONDS. With `regenerate`, the retained result is skipped (a run
+    already in flight is still joined) and the new result replaces it.
+    """
+    # `regenerate` only decides whether a retained result may be served, so it isn't part of the key.
+    key = (
+        _normalize_input(business_name), _normalize_input(niche), _normalize_input(location),
+        max_concurrency, page_timeout
+    )
+    return await generation_flights.run(
+        key,
+        lambda: _generate_pages(business_name, niche, location, max_concurrency, page_timeout, regenerate),
+        use_retained=not regenerate
+    )
+
+
+@instrumented_pipeline("generate")
+async def _generate_pages(
+    business_name: str,
+    niche: str,
+    location: str,
+    max_concurrency: int,
+    page_timeout: float,
+    regenerate: bool
+) -> dict:
+    """Generates every page of the site concurrently; see `generate_content_for_editing`."""
+    print(f"--- Stage 1: Generating initial content for '{business_name}' ---")
     
+    site_structure = build_site_structure(niche)
+    page_limit = asyncio.Semaphore(max_concurrency)
+
+    async def generate_page(page_topic: str) -> str:
+        async with page_limit:
+            return await asyncio.wait_for(
+                generate_page_content_tool_async(
+                    business_name=business_name,
+                    niche=niche,
+                    location=location,
+                    page_topic=page_topic,
+                    timeout=page_timeout,
+                    raise_on_error=True,
+                    regenerate=regenerate
+                ),
+                timeout=page_timeout
+            )
+
     generated_content = {}
-    for filename, page_info in site_structure.items():
-        content = generate_page_content_tool(
-            business_name=business_name,
-            niche=niche,
-            location=location,
-            page_topic=page_info["topic"]
+    failed_pages = []
+    with track_stage("generate", "pages") as span:
+        results = await asyncio.gather(
+            *(generate_page(page_info["topic"]) for page_info in site_structure.values()),
+            return_exceptions=True
         )
-        generated_content[filename] = content
-        print(f"  > Generated content for {filename}")
+        # gather keeps the pages in site order rather than completion order.
+        for filename, result in zip(site_structure, results):
+            if isinstance(result, BaseException):
+                generated_content[filename] = fallback_page_content(site_structure[filename]["topic"])
+                failed_pages.append(filename)
+                print(f"  > Failed to generate content for {filename}: {result!r}")
+            else:
+                generated_content[filename] = result
+                print(f"  > Generated content for {filename}")
+        if failed_pages:
+            span.fail()
+
+    return {
+        "success": len(failed_pages) < len(site_structure),
+        "content": generated_content,
+        "site_structure": site_structure,
+        "failed_pages": failed_pages
+    }
+
+
+async def stream_content_for_editing(
+    business_name: str,
+    niche: str,
+    location: str,
+    max_concurrency: int = PAGE_GENERATION_CONCURRENCY,
+    page_timeout: float = PAGE_GENERATION_TIMEOUT_SECONDS,
+    regenerate: bool = False
+) -> AsyncIterator[dict]:
+    """
+    Streaming variant of `generate_content_for_editing`.
+
+    Yields events as dictionaries with "event" and "data" keys, in this order:
+      - "structure": the site structure, sent before any model call returns.
+      - "delta": a chunk of HTML for one page, as soon as Gemini produces it.
+      - "page" / "page_failed": the complete content of a page once it is done.
+      - "done": the list of failed pages, after every page has finished.
+    """
+    print(f"--- Stage 1: Streaming initial content for '{business_name}' ---")
+
+    site_structure = build_site_structure(niche)
+    yield {"event": "structure", "data": {"site_structure": site_structure}}
+
+    events = asyncio.Queue()
+    page_limit = asyncio.Semaphore(max_concurrency)
+
+    async def generate_page(filename: str, page_topic: str):
+        chunks = []
+        try:
+            async with page_limit:
+                async for text in stream_page_content_tool_async(
+                    business_name=business_name,
+                    niche=niche,
+                    location=location,
+                    page_topic=page_topic,
+                    timeout=page_timeout,
+                    regenerate=regenerate
+                ):
+                    chunks.append(text)
+                    events.put_nowait({"event": "delta", "data": {"filename": filename, "text": text}})
+            events.put_nowait({"event": "page", "data": {"filename": filename, "content": "".join(chunks)}})
+        except Exception as e:
+            # The details stay in the server log; only a generic message goes to the client.
+            print(f"  > Failed to stream content for {filename}: {e!r}")
+            events.put_nowait({"event": "page_failed", "data": {
+                "filename": filename,
+                "content": fallback_page_content(page_topic),
+                "error": "Page generation failed."
+            }})
+
+    pending = set(site_structure)
+    failed_pages = []
+    # The per-page timeout also bounds the whole stream, since pages run in parallel.
+    loop = asyncio.get_running_loop()
+    waves = -(-len(site_structure) // max_concurrency)
+    deadline = loop.time() + page_timeout * waves
+    tasks = [
+        asyncio.create_task(generate_page(filename, page_info["topic"]))
+        for filename, page_info in site_structure.items()
+    ]
+    try:
+        while pending:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+            if event["event"] in ("page", "page_failed"):
+                pending.discard(event["data"]["filename"])
+                if event["event"] == "page_failed":
+                    failed_pages.append(event["data"]["filename"])
+                print(f"  > Finished streaming {event['data']['filename']}")
+            yield event
+
+        # Anything still pending has blown through its timeout.
+        for filename in pending:
+            failed_pages.append(filename)
+            yield {"event": "page_failed", "data": {
+                "filename": filename,
+                "content": fallback_page_content(site_structure[filename]["topic"]),
+                "error": "Page generation timed out."
+            }}
+
+        yield {"event": "done", "data": {"failed_pages": failed_pages}}
+    finally:
+        # Also runs when the client disconnects and the generator is closed early.
+        for task in tasks:
+            task.cancel()
 
-    return {"success": True, "content": generated_content, "site_structure": site_structure}
 
+def page_document_id(user_id: str, site_id: str, slug: str) -> str:
+    """The Sanity document ID of a page. It is stable, so re-deploys replace rather than duplicate."""
+    digest = hashlib.sha1(f"{user_id}|{site_id}|{slug}".encode("utf-8")).hexdigest()
+    return f"page-{digest}"
 
+
+def page_content_hash(document: dict) -> str:
+    """A hash of everything stored for a page, used to skip pages that haven't changed."""
+    return hashlib.sha256(json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+# Sites pushed before page IDs were deterministic have pages with random IDs and no site
+# field. The site's ID is the `_id` of its first page, and all its pages were created in
+# one transaction, so they share that page's `_rev` (Sanity sets it to the transaction ID,
+# and the old flow never updated a page). Deterministic "page-*" IDs are never matched.
+LEGACY_PAGES_QUERY = (
+    '*[_type == "page" && !(_id in path("page-*"))'
+    ' && (_id == $site_id || _rev == *[_id == $site_id][0]._rev)]._id'
+)
+
+
+def find_legacy_page_ids(site_id: str) -> dict:
+    """Returns {"success": True, "result": [document IDs]} for a legacy site's pages, or an "error"."""
+    return sanity_tool_query(LEGACY_PAGES_QUERY, {"site_id": site_id})
+
+
+@instrumented_pipeline("cms_push")
 def assemble_and_push_to_cms(
     business_name: str, 
     niche: str, 
     location: str,
     edited_content: Dict[str, str],
-    site_structure: Dict[str, Dict[str, str]]
+    site_structure: Dict[str, Dict[str, str]],
+    user_id: str,
+    site_id: str,
+    previous_hashes: Optional[Dict[str, str]] = None,
+    on_progress: Optional[Callable[..., None]] = None,
+    replace_legacy_pages: bool = False
 ) -> dict:
     """
-    Assembles the final content into Sanity.io documents and pushes them to the CMS.
+    Assembles the final content into Sanity.io documents and pushes only what changed.
+
+    Each page has a deterministic document ID per (user, site, slug) and is written with
+    `createOrReplace`, so a re-deploy updates the existing documents. Pages whose content
+    hash matches `previous_hashes` (from the last successful push) are skipped, and pages
+    that were removed since then are deleted. The returned `page_hashes` should be stored
+    and passed back on the next push.
+
+    Set `replace_legacy_pages` for a site pushed before page IDs were deterministic (it
+    has a record but no page hashes). Its old, randomly keyed page documents are deleted
+    in the same push, after the new ones are written, so the redeploy doesn't duplicate it.
+
+    If given, `on_progress(stage, detail)` is called as each stage finishes so callers
+    can push status updates to the user.
     """
+    report_progress = on_progress or (lambda stage, detail=None: None)
+    previous_hashes = previous_hashes or {}
     print(f"--- Stage 2: Assembling and pushing content to Sanity.io for '{business_name}' ---")
     
     # --- Step 1: Format the content into Sanity document structure ---
-    documents_to_create = []
-    for filename, content in edited_content.items():
-        page_info = site_structure.get(filename, {})
-        slug = filename.replace('.html', '')
-        
-        document = {
-            "_type": "page", # Assumes a 'page' schema in Sanity
-            "title": page_info.get("title", slug.capitalize()),
-            "slug": {"_type": "slug", "current": slug},
-            "content": content, # The user-edited HTML content
-            "businessName": business_name, # Storing metadata for context
-            "niche": niche,
-            "location": location
-        }
-        documents_to_create.append(document)
+    mutations = []
+    page_hashes = {}
+    pushed_pages, skipped_pages = [], []
+    with track_stage("cms_push", "assemble"):
+        for filename, content in edited_content.items():
+            page_info = site_structure.get(filename, {})
+            slug = filename.replace('.html', '')
+
+            document = {
+                "_id": page_document_id(user_id, site_id, slug),
+                "_type": "page", # Assumes a 'page' schema in Sanity
+                "title": page_info.get("title", slug.capitalize()),
+                "slug": {"_type": "slug", "current": slug},
+                "content": content, # The user-edited HTML content
+                "businessName": business_name, # Storing metadata for context
+                "niche": niche,
+                "location": location
+            }
+            page_hashes[slug] = page_content_hash(document)
+            if previous_hashes.get(slug) == page_hashes[slug]:
+                skipped_pages.append(slug)
+            else:
+                mutations.append({"createOrReplace": document})
+                pushed_pages.append(slug)
+
+        deleted_pages = [slug for slug in previous_hashes if slug not in page_hashes]
+        mutations.extend({"delete": {"id": page_document_id(user_id, site_id, slug)}} for slug in deleted_pages)
+
+    legacy_page_ids = []
+    if replace_legacy_pages:
+        with track_stage("cms_push", "legacy_lookup") as span:
+            legacy_result = find_legacy_page_ids(site_id)
+            if legacy_result.get("error"):
+                span.fail()
+        # Pushing without the lookup would duplicate the site, so a failure fails the push
+        # (and the task is retried).
+        if legacy_result.get("error"):
+            return {"success": False, "error": legacy_result["error"]}
+        legacy_page_ids = legacy_result["result"] or []
+        mutations.extend({"delete": {"id": document_id}} for document_id in legacy_page_ids)
     
-    print(f"  > Prepared {len(documents_to_create)} documents for Sanity.")
+    print(f"  > Prepared {len(pushed_pages)} changed pages for Sanity ({len(skipped_pages)} unchanged, {len(deleted_pages)} removed, {len(legacy_page_ids)} legacy replaced).")
+    report_progress("documents prepared", {
+        "documents": len(pushed_pages), "unchanged": len(skipped_pages), "removed": len(deleted_pages),
+        "legacy_replaced": len(legacy_page_ids)
+    })
 
-    # --- Step 2: Push the documents to Sanity.io using our tool ---
-    sanity_result = sanity_tool_create_documents(documents_to_create)
+    # --- Step 2: Push the changes to Sanity.io using our tool ---
+    if mutations:
+        with track_stage("cms_push", "sanity_mutate") as span:
+            # The documents are already known here, so Sanity needn't echo them back.
+            sanity_result = sanity_tool_mutate(mutations, return_documents=False)
+            if sanity_result.get("error"):
+                span.fail()
+        report_progress("Sanity mutate sent", {"success": not sanity_result.get("error")})
 
-    if sanity_result.get("error"):
-        return {"success": False, "error": sanity_result["error"]}
+        if sanity_result.get("error"):
+            return {"success": False, "error": sanity_result["error"]}
+    else:
+        sanity_result = {"success": True, "result": {"transactionIds": [], "results": []}}
+        report_progress("Sanity mutate skipped", {"reason": "no changes"})
 
     print(f"--- Content push to Sanity.io complete. ---")
     return {
         "success": True,
-        "sanity_result": sanity_result
+        "site_id": site_id,
+        "sanity_result": sanity_result,
+        "page_hashes": page_hashes,
+        "pushed_pages": pushed_pages,
+        "skipped_pages": skipped_pages,
+        "deleted_pages": deleted_pages,
+        "legacy_pages_replaced": legacy_page_ids
     }
-
@@ -10,42 +10,13 @@ from typing import Optional, Dict
 # Import the tools we built
 from app.agents.tools.content_generation import generate_page_content_tool
 from app.agents.tools.schema_generation import generate_schema_tool
-from app.agents.tools.deployment import deploy_to_netlify_tool
-
-# A simple HTML template for all pages
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{ font-family: sans-serif; line-height: 1.6; padding: 20px; max-width: 800px; margin: auto; }}
-        nav a {{ margin-right: 15px; }}
-        header, footer {{ text-align: center; padding: 20px 0; }}
-    </style>
-    {schema_script}
-</head>
-<body>
-    <header>
-        <h1>{business_name}</h1>
-        <nav>
-            <a href="index.html">Home</a>
-            <a href="about.html">About Us</a>
-            <a href="services.html">Services</a>
-            <a href="contact.html">Contact Us</a>
-        </nav>
-    </header>
-    <main>
-        {page_content}
-    </main>
-    <footer>
-        <p>&copy; 2025 {business_name}. All Rights Reserved.</p>
-    </footer>
-</body>
-</html>
-"""
+from app.agents.tools.deployment import deploy_artifact_to_netlify
+from app.agents.tools.site_artifact import SiteArtifact
+from app.agents.tools.site_templates import SiteShell
+
+# When set, every build is also written to SITE_EXPORT_DIR/{build_id} for inspection.
+SITE_EXPORT_DIR = os.getenv("SITE_EXPORT_DIR")
+
 
 def generate_content_for_editing(business_name: str, niche: str, location: str) -> dict:
     """
@@ -74,6 +45,31 @@ def generate_content_for_editing(business_name: str, niche: str, location: str)
     return {"success": True, "content": generated_content, "site_structure": site_structure}
 
 
+def build_site_artifact(
+    business_name: str,
+    edited_content: Dict[str, str],
+    site_structure: Dict[str, Dict[str, str]],
+    schema_script: str = ""
+) -> SiteArtifact:
+    """
+    Renders every page of a site into an in-memory artifact.
+
+    The page shell (header, nav built from `site_structure`, footer) is rendered once for
+    the whole site; each page only fills in its title and content. The schema script goes
+    on the home page.
+    """
+    shell = SiteShell(business_name, site_structure)
+    artifact = SiteArtifact()
+    for filename, page_info in site_structure.items():
+        page_content = edited_content.get(filename, f"<h1>Error: Content for {filename} not found.</h1>")
+        artifact.add(filename, shell.render(
+            title=page_info["title"],
+            content=page_content,
+            head_extra=schema_script if filename == "index.html" else ""
+        ))
+    return artifact
+
+
 def assemble_and_deploy_asset(
     business_name: str, 
     niche: str, 
@@ -81,46 +77,40 @@ def assemble_and_deploy_asset(
     edited_content: Dict[str, str],
     site_structure: Dict[str, Dict[str, str]],
     netlify_api_key: str,
-    site_id: Optional[str] = None # Parameter for re-deploying
+    site_id: Optional[str] = None, # Parameter for re-deploying
+    export_dir: Optional[str] = SITE_EXPORT_DIR
 ) -> dict:
     """
     Assembles the final site from (potentially edited) content and deploys it.
+
+    The site is built in memory: each page is rendered, encoded and hashed once, and the
+    deploy uploads those same buffers. It is written to disk only if `export_dir` is set.
     """
     print(f"--- Stage 2: Assembling and deploying site for '{business_name}' ---")
     
     build_id = str(uuid.uuid4())
-    output_dir = Path(f"generated_sites/{build_id}")
-    output_dir.mkdir(parents=True, exist_ok=True)
 
     schema_script = generate_schema_tool(business_name, niche, location)
+    artifact = build_site_artifact(business_name, edited_content, site_structure, schema_script)
+    print(f"  > Assembled {len(artifact)} pages")
 
-    for filename, page_info in site_structure.items():
-        page_content = edited_content.get(filename, f"<h1>Error: Content for {filename} not found.</h1>")
-        
-        full_html = HTML_TEMPLATE.format(
-            title=page_info["title"],
-            schema_script=schema_script if filename == "index.html" else "",
-            business_name=business_name,
-            page_content=page_content
-        )
-        with open(output_dir / filename, "w", encoding="utf-8") as f:
-            f.write(full_html)
-        print(f"  > Assembled {filename}")
+    output_path = str(artifact.export(Path(export_dir) / build_id)) if export_dir else None
 
-    print(f"--- Assembly complete. Starting deployment... ---")
+    print(f"--- Assembly complete ({len(artifact)} files, {artifact.total_bytes} bytes). Starting deployment... ---")
     if not netlify_api_key:
         print("  > SKIPPING DEPLOYMENT: No Netlify API key provided.")
-        return {"success": True, "output_path": str(output_dir), "deployment_status": "skipped"}
+        return {"success": True, "output_path": output_path, "files": artifact.manifest(), "deployment_status": "skipped"}
 
     # CORRECTED: Pass the site_id to the deployment tool
-    deployment_result = deploy_to_netlify_tool(
-        directory_path=str(output_dir), 
+    deployment_result = deploy_artifact_to_netlify(
+        artifact,
         netlify_api_key=netlify_api_key,
         site_id=site_id
     )
     
     return {
         "success": True, 
-        "output_path": str(output_dir),
+        "output_path": output_path,
+        "files": artifact.manifest(),
         "deployment_result": deployment_result
     }
@@ -4,56 +4,48 @@
 
 import os
 import json
-import google.generativeai as genai
+import asyncio
 
 # Import the tools we built
-from app.agents.tools.google_search import google_search_tool
-from app.agents.tools.competitor_analysis import competitor_analysis_tool
+from app.agents.tools.google_search import google_search_tool_async, normalize_query
+from app.agents.tools.competitor_analysis import analyze_competitors_concurrently
+from app.agents.tools.html_extraction import MAX_H2S
+# The Gemini API key is configured by the LLM cache module.
+from app.agents.tools.llm_cache import cached_generate_content_async
+from app.agents.tools.heuristic_scoring import heuristic_score
+from app.metrics import instrumented_pipeline, track_stage
+from app.single_flight import SingleFlight
 
-# Configure the Gemini API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Scraping limits: one slow competitor site must not stall the whole analysis.
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "5"))
+SCRAPE_PER_HOST_LIMIT = int(os.getenv("SCRAPE_PER_HOST_LIMIT", "2"))
+SCRAPE_DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "12"))
 
-def analyze_market_opportunity(niche: str, location: str) -> dict:
-    """
-    Orchestrates the process of finding and analyzing a market opportunity.
+# Markets whose on-page signals are clear-cut get the local heuristic score; only ambiguous
+# ones (or requests with force_llm) go to Gemini. Set to "false" to always use Gemini.
+HEURISTIC_SCORING_ENABLED = os.getenv("HEURISTIC_SCORING_ENABLED", "true").lower() == "true"
 
-    Args:
-        niche: The business niche (e.g., "plumber").
-        location: The geographic location (e.g., "Austin, TX").
+# Identical analyses that overlap share one run, and a finished analysis is served to
+# identical requests for this many seconds. Set to 0 to only share in-flight runs.
+ANALYSIS_RETAIN_SECONDS = float(os.getenv("ANALYSIS_RETAIN_SECONDS", "30"))
+analysis_flights = SingleFlight("analyze", retain_seconds=ANALYSIS_RETAIN_SECONDS)
 
-    Returns:
-        A dictionary containing the analysis and the final opportunity score.
-    """
-    print(f"--- Starting analysis for '{niche}' in '{location}' ---")
+def _parse_json_response(text: str) -> dict:
+    """Cleans a Gemini response of Markdown code fences and parses it as JSON."""
+    cleaned_response = text.strip().replace('```json', '').replace('```', '')
+    return json.loads(cleaned_response)
 
-    # --- Step 1: Use the google_search_tool to find competitors ---
-    search_query = f"top {niche}s in {location}"
-    competitors = google_search_tool(search_query)
-    
-    if not competitors:
-        return {"error": "Could not find any competitors in the initial Google search."}
-
-    # --- Step 2: Analyze each competitor using the competitor_analysis_tool ---
-    analysis_data = []
-    print(f"Found {len(competitors)} potential competitors. Analyzing top 5...")
-    for competitor in competitors[:5]: # Analyze the top 5 for speed
-        url = competitor.get('link')
-        if not url:
-            continue
-        
-        print(f"  > Analyzing {url}...")
-        on_page_data = competitor_analysis_tool(url)
-        if "error" not in on_page_data:
-            analysis_data.append(on_page_data)
+def build_search_query(niche: str, location: str) -> str:
+    """The Google query used to find the competitors for a niche and location."""
+    return f"top {niche}s in {location}"
 
-    if not analysis_data:
-        return {"error": "Could not successfully analyze any competitor websites."}
+def select_competitor_urls(competitors: list, limit: int = 5) -> list:
+    """Picks the competitor URLs to analyze from the search results (the top 5, for speed)."""
+    return [competitor.get('link') for competitor in competitors[:limit] if competitor.get('link')]
 
-    # --- Step 3: Use Gemini to calculate the Opportunity Score ---
-    print("Competitor analysis complete. Preparing data for Gemini...")
-    
-    # Create the prompt for the LLM
-    prompt = f"""
+def build_scoring_prompt(niche: str, location: str, analysis_data: list) -> str:
+    """Builds the Gemini prompt that turns competitor SEO data into an opportunity score."""
+    return f"""
     You are an expert Local SEO Market Analyst. Your task is to calculate a "Digital Desert Opportunity Score" from 0 to 100 for the niche '{niche}' in '{location}'.
 
     A high score (80-100) means it's a "Digital Desert": an excellent opportunity with weak online competition.
@@ -71,14 +63,17 @@ def analyze_market_opportunity(niche: str, location: str) -> dict:
     Return the result as a JSON object with the keys "opportunity_score" and "justification".
     """
 
+async def score_opportunity(niche: str, location: str, analysis_data: list, regenerate: bool = False) -> dict:
+    """
+    Asks Gemini for the opportunity score of a market, given its competitors' SEO data.
+
+    Returns:
+        The final analysis dictionary, or a dictionary with an 'error' key.
+    """
+    prompt = build_scoring_prompt(niche, location, analysis_data)
     try:
-        # CORRECTED: Using the cheapest model as per the new rule.
-        model = genai.GenerativeModel('gemini-2.0-flash-lite-001')
-        response = model.generate_content(prompt)
-        
-        # Clean the response to be valid JSON
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-        llm_result = json.loads(cleaned_response)
+        # Identical prompts reuse the cached score; only responses that parse are cached.
+        llm_result = await cached_generate_content_async(prompt, regenerate=regenerate, parse=_parse_json_response)
 
         return {
             "niche": niche,
@@ -89,7 +84,219 @@ def analyze_market_opportunity(niche: str, location: str) -> dict:
         }
 
     except Exception as e:
-        return {"error": f"An error occurred during Gemini analysis: {e}"}
+        # The details stay in the server log; an HTTP error's text can carry request details.
+        print(f"An error occurred during Gemini analysis: {e}")
+        return {"error": "An error occurred during Gemini analysis."}
+
+# Batched scoring packs several markets into one Gemini call. Each competitor is reduced
+# to a compact summary so the prompt stays small however many markets it carries.
+SCORING_SUMMARY_MAX_CHARS = 160
+
+def summarize_competitor(result: dict) -> dict:
+    """The fields of a competitor analysis the score depends on, trimmed for a batched prompt."""
+    def trim(text):
+        return text if len(text) <= SCORING_SUMMARY_MAX_CHARS else text[:SCORING_SUMMARY_MAX_CHARS] + "..."
+    return {
+        "title": trim(result.get("title", "N/A")),
+        "meta_description": trim(result.get("meta_description", "N/A")),
+        "h1": trim(result.get("h1", "N/A")),
+        "h2s": [trim(h2) for h2 in result.get("h2s", [])[:MAX_H2S]],
+        "h2_count": len(result.get("h2s", []))
+    }
+
+def build_batch_scoring_prompt(markets: list) -> str:
+    """Builds one prompt that scores several (niche, location, analysis_data) markets at once."""
+    payload = [
+        {
+            "id": index,
+            "niche": niche,
+            "location": location,
+            "competitors": [summarize_competitor(result) for result in analysis_data]
+        }
+        for index, (niche, location, analysis_data) in enumerate(markets)
+    ]
+    return f"""
+    You are an expert Local SEO Market Analyst. For each market below, calculate a "Digital Desert Opportunity Score" from 0 to 100.
+
+    A high score (80-100) means it's a "Digital Desert": an excellent opportunity with weak online competition.
+    A low score (0-40) means it's a "Digital Oasis": a saturated market with strong competition.
+
+    Each market lists the on-page SEO data of its top competitors (h2_count is the number of H2 headings, counted up to {MAX_H2S}):
+    {json.dumps(payload, separators=(",", ":"))}
+
+    Consider these factors for every market independently:
+    - Titles and H1s: Are they generic or keyword-stuffed? Weak titles like "Home" or "Services" indicate low effort.
+    - Meta Descriptions: Are they missing or uncompelling?
+    - H2 Headings: Is there a clear, logical structure, or is it sparse?
+
+    Return a JSON array with exactly one object per market, each with the keys "id" (the market's id),
+    "opportunity_score" (an integer from 0 to 100) and "justification" (a brief reason).
+    """
+
+def _parse_batch_scores(text: str) -> dict:
+    """Parses a batched scoring response into {market id: {"opportunity_score", "justification"}}."""
+    entries = _parse_json_response(text)
+    if not isinstance(entries, list):
+        raise ValueError("Expected a JSON array of market scores.")
+    scores = {}
+    for entry in entries:
+        # Entries that are malformed are left out; those markets are scored on their own.
+        if not isinstance(entry, dict) or not isinstance(entry.get("id"), int):
+            continue
+        score = entry.get("opportunity_score")
+        if isinstance(score, (int, float)) and not isinstance(score, bool) and 0 <= score <= 100:
+            scores[entry["id"]] = {"opportunity_score": score, "justification": entry.get("justification")}
+    return scores
+
+async def score_opportunities_batch(markets: list, regenerate: bool = False) -> list:
+    """
+    Scores several markets with a single Gemini call.
+
+    Args:
+        markets: (niche, location, analysis_data) tuples.
+        regenerate: Ignore cached scores and ask Gemini again.
+
+    Returns:
+        One result per market, in order, shaped like `score_opportunity`'s output. Markets
+        missing from the response, or all of them if it doesn't parse, are scored with
+        individual `score_opportunity` calls instead.
+    """
+    if len(markets) == 1:
+        niche, location, analysis_data = markets[0]
+        return [await score_opportunity(niche, location, analysis_data, regenerate=regenerate)]
+
+    try:
+        scores = await cached_generate_content_async(
+            build_batch_scoring_prompt(markets),
+            regenerate=regenerate,
+            parse=_parse_batch_scores,
+            generation_config={"response_mime_type": "application/json"}
+        )
+    except Exception as e:
+        print(f"  > Batched scoring failed ({e}); scoring {len(markets)} markets individually.")
+        scores = {}
+
+    results = [None] * len(markets)
+    missing = []
+    for index, (niche, location, analysis_data) in enumerate(markets):
+        if index in scores:
+            results[index] = {"niche": niche, "location": location, **scores[index], "competitor_data": analysis_data}
+        else:
+            missing.append(index)
+
+    if missing:
+        fallbacks = await asyncio.gather(
+            *(score_opportunity(*markets[index], regenerate=regenerate) for index in missing)
+        )
+        for index, result in zip(missing, fallbacks):
+            results[index] = result
+    return results
+
+def heuristic_result(niche: str, location: str, analysis_data: list, force_llm: bool = False) -> tuple:
+    """
+    Scores a market locally first.
+
+    Returns:
+        (result, heuristic): `result` is the final analysis when the heuristic score is
+        clear-cut, or None when the market still needs Gemini (it is ambiguous, heuristics
+        are disabled, or `force_llm` is set). `heuristic` is the local score either way.
+    """
+    heuristic = heuristic_score(niche, location, analysis_data)
+    if force_llm or not HEURISTIC_SCORING_ENABLED or heuristic["ambiguous"]:
+        return None, heuristic
+    return {
+        "niche": niche,
+        "location": location,
+        "opportunity_score": heuristic["opportunity_score"],
+        "justification": heuristic["justification"],
+        "scoring_method": "heuristic",
+        "competitor_data": analysis_data
+    }, heuristic
+
+def with_llm_scoring(result: dict, heuristic: dict) -> dict:
+    """Marks a Gemini result as such and keeps the heuristic score next to it for comparison."""
+    if "error" in result:
+        return result
+    return {**result, "scoring_method": "llm", "heuristic_score": heuristic["opportunity_score"]}
+
+async def analyze_market_opportunity(niche: str, location: str, regenerate: bool = False, force_llm: bool = False) -> dict:
+    """
+    Orchestrates the process of finding and analyzing a market opportunity.
+
+    Every stage is awaited on the caller's event loop, so a waiting analysis holds no thread.
+    Concurrent calls for the same market (compared case- and whitespace-insensitively) share
+    a single run, and its result is reused for ANALYSIS_RETAIN_SECONDS. With `regenerate`, the
+    retained result is skipped (a run already in flight is still joined) and the new result
+    replaces it.
+
+    Args:
+        niche: The business niche (e.g., "plumber").
+        location: The geographic location (e.g., "Austin, TX").
+        regenerate: Ignore any cached score for identical competitor data and ask Gemini again.
+        force_llm: Ask Gemini even when the local heuristic score is clear-cut.
+
+    Returns:
+        A dictionary containing the analysis and the final opportunity score. "scoring_method"
+        says whether the score came from the local heuristics or from Gemini.
+    """
+    # `regenerate` only decides whether a retained result may be served, so it isn't part of the key.
+    key = (normalize_query(niche), normalize_query(location), force_llm)
+    result = await analysis_flights.run(
+        key,
+        lambda: _run_market_analysis(niche, location, regenerate=regenerate, force_llm=force_llm),
+        use_retained=not regenerate
+    )
+    if "error" not in result:
+        # The shared run may have been started with a different spelling of the same market.
+        result.update(niche=niche, location=location)
+    return result
+
+
+@instrumented_pipeline("analyze")
+async def _run_market_analysis(niche: str, location: str, regenerate: bool, force_llm: bool) -> dict:
+    """Runs the search, scrape and scoring stages of one analysis."""
+    print(f"--- Starting analysis for '{niche}' in '{location}' ---")
+
+    # --- Step 1: Use the google_search_tool to find competitors ---
+    with track_stage("analyze", "search") as span:
+        competitors = await google_search_tool_async(build_search_query(niche, location))
+        if not competitors:
+            span.fail()
+
+    if not competitors:
+        return {"error": "Could not find any competitors in the initial Google search."}
+
+    # --- Step 2: Analyze the competitors concurrently using the competitor_analysis_tool ---
+    urls = select_competitor_urls(competitors)
+    print(f"Found {len(competitors)} potential competitors. Analyzing top {len(urls)} concurrently...")
+    with track_stage("analyze", "scrape") as span:
+        results = await analyze_competitors_concurrently(
+            urls,
+            max_concurrency=SCRAPE_CONCURRENCY,
+            per_host_limit=SCRAPE_PER_HOST_LIMIT,
+            deadline=SCRAPE_DEADLINE_SECONDS
+        )
+        analysis_data = [result for result in results if "error" not in result]
+        if not analysis_data:
+            span.fail()
+    print(f"  > Analyzed {len(analysis_data)} of {len(urls)} competitor sites.")
+
+    if not analysis_data:
+        return {"error": "Could not successfully analyze any competitor websites."}
+
+    # --- Step 3: Score locally, and escalate to Gemini only if that's not conclusive ---
+    with track_stage("analyze", "heuristic"):
+        result, heuristic = heuristic_result(niche, location, analysis_data, force_llm=force_llm)
+    if result is not None:
+        print(f"  > Heuristic score {result['opportunity_score']} is conclusive; skipping Gemini.")
+        return result
+
+    print("Competitor analysis complete. Preparing data for Gemini...")
+    with track_stage("analyze", "score") as span:
+        result = await score_opportunity(niche, location, analysis_data, regenerate=regenerate)
+        if "error" in result:
+            span.fail()
+    return with_llm_scoring(result, heuristic)
 
 
 # This allows us to test the agent directly
@@ -97,7 +304,7 @@ if __name__ == '__main__':
     test_niche = "roofer"
     test_location = "Boise, ID"
     
-    final_analysis = analyze_market_opportunity(test_niche, test_location)
+    final_analysis = asyncio.run(analyze_market_opportunity(test_niche, test_location))
 
     print("\n--- FINAL ANALYSIS COMPLETE ---")
     if "error" in final_analysis:
@@ -0,0 +1,33 @@
+# File: app/agents/tools/async_http.py
+# Author: MCP Development Core
+# Description: Pooled httpx.AsyncClients shared by the async tools, one per event loop.
+
+import asyncio
+import threading
+from typing import Optional
+import httpx
+
+
+class LoopBoundAsyncClient:
+    """
+    Hands out one pooled `httpx.AsyncClient` per event loop.
+
+    Pooled connections are bound to the event loop they were opened on, so the client is
+    recreated when it is first used from a different loop (e.g. a script calling
+    `asyncio.run` more than once). The keyword arguments are passed to every client.
+    """
+
+    def __init__(self, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def get(self) -> httpx.AsyncClient:
+        """Returns the client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._client is None or self._loop is not loop:
+                self._client = httpx.AsyncClient(**self._client_kwargs)
+                self._loop = loop
+            return self._client
@@ -2,8 +2,34 @@
 # Author: MCP Development Core
 # Description: A tool for scraping and analyzing a competitor's on-page SEO.
 
+import os
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urldefrag, urlparse
+
 import httpx
-from bs4 import BeautifulSoup
+
+from app.agents.tools.html_extraction import create_extractor
+from app.agents.tools.competitor_snapshots import (
+    conditional_headers, get_snapshot, is_fresh, revalidated, save_snapshot
+)
+from app.metrics import track_dependency
+
+# Set a user-agent to mimic a real browser visit
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+REQUEST_TIMEOUT = 10.0
+
+# Stop downloading a page after this many bytes; the SEO fields we need are near the top.
+MAX_PAGE_BYTES = int(os.getenv("MAX_PAGE_BYTES", str(1024 * 1024)))
+
+
+def _result_from(url: str, extractor) -> dict:
+    """Builds the tool's result dict from a finished extractor."""
+    return {"url": url, **extractor.close()}
+
 
 def competitor_analysis_tool(url: str) -> dict:
     """
@@ -12,46 +38,189 @@ def competitor_analysis_tool(url: str) -> dict:
     Args:
         url: The URL of the competitor's page to analyze.
 
+    A recent analysis of the same URL is reused from the snapshot store without a request;
+    an older one is re-validated with a conditional request.
+
     Returns:
         A dictionary containing the page title, meta description, H1, and H2 headings.
         Returns a dictionary with an 'error' key if scraping fails.
     """
-    # Set a user-agent to mimic a real browser visit
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
+    snapshot = get_snapshot(url)
+    if snapshot is not None and is_fresh(snapshot):
+        return snapshot["result"]
+
     try:
-        with httpx.Client(headers=headers, follow_redirects=True, timeout=10.0) as client:
-            response = client.get(url)
-            # Raise an exception for bad status codes (4xx or 5xx)
+        extractor = create_extractor()
+        with track_dependency("competitor_site", "fetch"), \
+                httpx.Client(headers=DEFAULT_HEADERS, follow_redirects=True, timeout=REQUEST_TIMEOUT) as client:
+            with client.stream("GET", url, headers=conditional_headers(snapshot)) as response:
+                if response.status_code == 304 and snapshot is not None:
+                    return revalidated(url, snapshot)
+                # Raise an exception for bad status codes (4xx or 5xx)
+                response.raise_for_status()
+                # Parse while downloading, and stop as soon as nothing more is needed.
+                for chunk in response.iter_text():
+                    extractor.feed(chunk)
+                    if extractor.is_complete or response.num_bytes_downloaded >= MAX_PAGE_BYTES:
+                        break
+
+        result = _result_from(url, extractor)
+        save_snapshot(url, result, response.headers)
+        return result
+
+    except httpx.RequestError as e:
+        return {"error": f"HTTP request failed: {e.__class__.__name__}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e.__class__.__name__}"}
+
+
+async def _fetch_and_extract(client: httpx.AsyncClient, url: str, snapshot: Optional[dict]) -> dict:
+    """
+    Streams one page through an extractor, stopping as soon as nothing more is needed.
+    With a stale snapshot the request is conditional, and a 304 reuses the snapshot.
+    """
+    extractor = create_extractor()
+    with track_dependency("competitor_site", "fetch"):
+        async with client.stream("GET", url, headers=conditional_headers(snapshot)) as response:
+            if response.status_code == 304 and snapshot is not None:
+                return await asyncio.to_thread(revalidated, url, snapshot)
             response.raise_for_status()
+            async for chunk in response.aiter_text():
+                extractor.feed(chunk)
+                if extractor.is_complete or response.num_bytes_downloaded >= MAX_PAGE_BYTES:
+                    break
+    result = _result_from(url, extractor)
+    await asyncio.to_thread(save_snapshot, url, result, response.headers)
+    return result
+
+
+async def _analyze_with_client(
+    client: httpx.AsyncClient,
+    url: str,
+    global_limit: asyncio.Semaphore,
+    host_limit: asyncio.Semaphore,
+    timeout: Optional[float] = None
+) -> dict:
+    """
+    Fetches and analyzes one URL on a shared client, respecting both concurrency limits.
+    `timeout` bounds the fetch itself, not the time spent waiting for a free slot.
+    """
+    # A fresh snapshot needs no request at all, so it doesn't wait for a slot either. The
+    # snapshot store is SQLite-backed, so it is read and written off the event loop.
+    snapshot = await asyncio.to_thread(get_snapshot, url)
+    if snapshot is not None and is_fresh(snapshot):
+        return snapshot["result"]
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Extract key SEO elements
-        title = soup.find('title').get_text(strip=True) if soup.find('title') else 'N/A'
-        
-        meta_description_tag = soup.find('meta', attrs={'name': 'description'})
-        meta_description = meta_description_tag['content'].strip() if meta_description_tag else 'N/A'
-        
-        h1 = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'N/A'
-        
-        h2s = [h2.get_text(strip=True) for h2 in soup.find_all('h2')]
-
-        return {
-            "url": url,
-            "title": title,
-            "meta_description": meta_description,
-            "h1": h1,
-            "h2s": h2s
-        }
+    try:
+        async with global_limit, host_limit:
+            return await asyncio.wait_for(_fetch_and_extract(client, url, snapshot), timeout)
 
+    except asyncio.TimeoutError:
+        return {"error": f"Analysis of {url} timed out after {timeout}s"}
     except httpx.RequestError as e:
         return {"error": f"HTTP request failed: {e.__class__.__name__}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {e.__class__.__name__}"}
 
+
+class CompetitorScraper:
+    """
+    Scrapes competitor pages for many analyses at once, over one pooled client.
+
+    Each URL is fetched at most once per scraper: analyses that share a competitor await
+    the same fetch. Use it as an async context manager.
+    """
+
+    def __init__(self, max_concurrency: int = 10, per_host_limit: int = 2, timeout: Optional[float] = 15.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(per_host_limit))
+        self._fetches: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+
+    async def __aenter__(self) -> "CompetitorScraper":
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS, follow_redirects=True, timeout=REQUEST_TIMEOUT, limits=limits
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pending = [task for task in self._fetches.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await self._client.aclose()
+
+    async def analyze(self, url: str) -> dict:
+        """Returns the analysis of `url`, shaped like `competitor_analysis_tool`'s output."""
+        self.requests += 1
+        key = urldefrag(url).url
+        fetch = self._fetches.get(key)
+        if fetch is None:
+            fetch = asyncio.create_task(_analyze_with_client(
+                self._client, url, self._global_limit, self._host_limits[urlparse(url).netloc], self.timeout
+            ))
+            self._fetches[key] = fetch
+        # Shielded, so one cancelled caller doesn't cancel the fetch for everyone else.
+        return await asyncio.shield(fetch)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "unique_urls": len(self._fetches)}
+
+
+async def analyze_competitors_concurrently(
+    urls: List[str],
+    max_concurrency: int = 5,
+    per_host_limit: int = 2,
+    deadline: float = 15.0
+) -> List[dict]:
+    """
+    Analyzes several competitor URLs concurrently over one pooled connection.
+
+    Args:
+        urls: The competitor URLs to analyze.
+        max_concurrency: The maximum number of pages fetched at the same time.
+        per_host_limit: The maximum number of simultaneous requests to a single host.
+        deadline: The overall time budget in seconds for the whole batch.
+
+    Returns:
+        One result per URL, in the same order as `urls`. Each result has the same shape as
+        `competitor_analysis_tool`'s output. URLs still in flight when the deadline hits are
+        cancelled and reported with an 'error' key, so the caller always gets partial results.
+    """
+    if not urls:
+        return []
+
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host_limit))
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+
+    async with httpx.AsyncClient(
+        headers=DEFAULT_HEADERS, follow_redirects=True, timeout=REQUEST_TIMEOUT, limits=limits
+    ) as client:
+        tasks = [
+            asyncio.create_task(
+                _analyze_with_client(client, url, global_limit, host_limits[urlparse(url).netloc])
+            )
+            for url in urls
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Let the cancelled requests unwind before the client closes its connections.
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for url, task in zip(urls, tasks):
+        if task in done:
+            results.append(task.result())
+        else:
+            results.append({"error": f"Analysis deadline of {deadline}s exceeded for {url}"})
+    return results
+
 # This allows us to test the tool directly
 if __name__ == '__main__':
     print("--- Testing competitor_analysis_tool ---")
@@ -0,0 +1,74 @@
+# File: app/agents/tools/competitor_snapshots.py
+# Author: MCP Development Core
+# Description: A persistent store of competitor page analyses, with HTTP validators for conditional re-fetches.
+
+import os
+import copy
+import time
+from typing import Optional
+from urllib.parse import urldefrag
+
+from app.agents.tools.response_cache import TieredCache
+
+# A snapshot younger than this is reused without touching the network.
+COMPETITOR_SNAPSHOT_FRESH_SECONDS = float(os.getenv("COMPETITOR_SNAPSHOT_FRESH_SECONDS", str(6 * 3600)))
+# After that, it is kept this long so its ETag/Last-Modified can make the re-fetch conditional.
+COMPETITOR_SNAPSHOT_TTL_SECONDS = float(os.getenv("COMPETITOR_SNAPSHOT_TTL_SECONDS", str(30 * 24 * 3600)))
+
+snapshot_cache = TieredCache(
+    "competitor_pages",
+    ttl_seconds=COMPETITOR_SNAPSHOT_TTL_SECONDS,
+    max_memory_entries=int(os.getenv("COMPETITOR_SNAPSHOT_MEMORY_ENTRIES", "512")),
+    max_disk_entries=int(os.getenv("COMPETITOR_SNAPSHOT_DISK_ENTRIES", "5000"))
+)
+
+
+def _key(url: str) -> str:
+    return TieredCache.make_key(urldefrag(url).url)
+
+
+def get_snapshot(url: str) -> Optional[dict]:
+    """
+    Returns the stored snapshot of `url`, or None.
+
+    A snapshot has the keys "result" (the analysis, shaped like `competitor_analysis_tool`'s
+    output), "etag", "last_modified" and "fetched_at".
+    """
+    snapshot = snapshot_cache.get(_key(url))
+    # The memory tier hands out the stored object itself; callers get their own copy.
+    return copy.deepcopy(snapshot) if snapshot is not None else None
+
+
+def is_fresh(snapshot: dict) -> bool:
+    """True if the snapshot can be used without asking the server."""
+    return time.time() - snapshot["fetched_at"] < COMPETITOR_SNAPSHOT_FRESH_SECONDS
+
+
+def conditional_headers(snapshot: Optional[dict]) -> dict:
+    """The If-None-Match / If-Modified-Since headers for re-validating a snapshot."""
+    headers = {}
+    if snapshot:
+        if snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+    return headers
+
+
+def save_snapshot(url: str, result: dict, response_headers) -> None:
+    """Stores a successful analysis with the response's validators. Failed analyses are not stored."""
+    if "error" in result:
+        return
+    snapshot_cache.set(_key(url), {
+        "result": result,
+        "etag": response_headers.get("etag"),
+        "last_modified": response_headers.get("last-modified"),
+        "fetched_at": time.time()
+    })
+
+
+def revalidated(url: str, snapshot: dict) -> dict:
+    """Marks a snapshot as fresh again after a 304 Not Modified and returns its analysis."""
+    snapshot["fetched_at"] = time.time()
+    snapshot_cache.set(_key(url), snapshot)
+    return copy.deepcopy(snapshot["result"])
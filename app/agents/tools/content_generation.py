@@ -3,19 +3,57 @@
 # Description: A tool for generating localized, keyword-informed page content.
 
 import os
-import google.generativeai as genai
+from typing import AsyncIterator, Optional
 # CORRECTED: Explicitly import and call load_dotenv to ensure environment is set.
 from dotenv import load_dotenv
 
+from app.agents.tools.llm_cache import (
+    cached_generate_content,
+    cached_generate_content_async,
+    cached_stream_content_async
+)
+
 # Load all environment variables from the .env file in the project root.
 load_dotenv()
 
+def fallback_page_content(page_topic: str) -> str:
+    """The placeholder HTML shown in the editor when a page could not be generated."""
+    return f"<h1>Error Generating Content</h1><p>An error occurred while trying to generate content for the {page_topic} page.</p>"
+
+def _build_page_prompt(business_name: str, niche: str, location: str, page_topic: str, keywords: list = None) -> str:
+    """Builds the copywriting prompt shared by the blocking and streaming tools."""
+    # Construct a detailed prompt for the LLM
+    return f"""
+    You are an expert local SEO copywriter. Your task is to write the complete content for a webpage.
+
+    **Business Details:**
+    - Business Name: {business_name}
+    - Niche: {niche}
+    - Location: {location}
+
+    **Page Topic:** {page_topic}
+
+    **Instructions:**
+    1.  Write in a professional, trustworthy, and customer-focused tone.
+    2.  The content should be at least 400 words long.
+    3.  Start with a compelling `<h1>` heading that is relevant to the page topic.
+    4.  Structure the content with multiple `<h2>` subheadings.
+    5.  Write clear and informative paragraphs under each subheading.
+    6.  Naturally weave the business name, niche, and location throughout the text.
+    7.  If keywords are provided, incorporate them naturally. Keywords: {keywords if keywords else 'N/A'}.
+    8.  End with a clear Call to Action, encouraging visitors to call or fill out a form.
+    9.  The final output should be ONLY the raw HTML content for the page body, starting with the `<h1>` tag. Do not include `<html>`, `<head>`, or `<body>` tags.
+    """
+
 def generate_page_content_tool(
     business_name: str, 
     niche: str, 
     location: str, 
     page_topic: str, 
-    keywords: list = None
+    keywords: list = None,
+    timeout: Optional[float] = None,
+    raise_on_error: bool = False,
+    regenerate: bool = False
 ) -> str:
     """
     Generates a full page of content for a specific topic using the Gemini API.
@@ -26,43 +64,77 @@ def generate_page_content_tool(
         location: The geographic location (e.g., "Boise, ID").
         page_topic: The specific topic of the page (e.g., "Home", "About Us", "Roof Repair Services").
         keywords: An optional list of keywords to naturally include in the content.
+        timeout: An optional limit in seconds for the Gemini request.
+        raise_on_error: Re-raise failures instead of returning placeholder HTML, so callers
+                        generating many pages can tell which ones failed.
+        regenerate: Ignore any cached response for this exact prompt and call the model again.
 
     Returns:
         A string containing the generated page content in HTML format.
     """
     print(f"--- Generating content for '{page_topic}' page for '{business_name}' ---")
 
-    # Construct a detailed prompt for the LLM
-    prompt = f"""
-    You are an expert local SEO copywriter. Your task is to write the complete content for a webpage.
+    prompt = _build_page_prompt(business_name, niche, location, page_topic, keywords)
 
-    **Business Details:**
-    - Business Name: {business_name}
-    - Niche: {niche}
-    - Location: {location}
+    try:
+        # Identical prompts are served from the LLM cache unless a regeneration is requested
+        request_options = {"timeout": timeout} if timeout else None
+        return cached_generate_content(prompt, regenerate=regenerate, request_options=request_options)
+    except Exception as e:
+        print(f"An error occurred during content generation: {e}")
+        if raise_on_error:
+            raise
+        return fallback_page_content(page_topic)
 
-    **Page Topic:** {page_topic}
 
-    **Instructions:**
-    1.  Write in a professional, trustworthy, and customer-focused tone.
-    2.  The content should be at least 400 words long.
-    3.  Start with a compelling `<h1>` heading that is relevant to the page topic.
-    4.  Structure the content with multiple `<h2>` subheadings.
-    5.  Write clear and informative paragraphs under each subheading.
-    6.  Naturally weave the business name, niche, and location throughout the text.
-    7.  If keywords are provided, incorporate them naturally. Keywords: {keywords if keywords else 'N/A'}.
-    8.  End with a clear Call to Action, encouraging visitors to call or fill out a form.
-    9.  The final output should be ONLY the raw HTML content for the page body, starting with the `<h1>` tag. Do not include `<html>`, `<head>`, or `<body>` tags.
-    """
+async def generate_page_content_tool_async(
+    business_name: str,
+    niche: str,
+    location: str,
+    page_topic: str,
+    keywords: list = None,
+    timeout: Optional[float] = None,
+    raise_on_error: bool = False,
+    regenerate: bool = False
+) -> str:
+    """Async counterpart of `generate_page_content_tool`, taking the same arguments."""
+    print(f"--- Generating content for '{page_topic}' page for '{business_name}' ---")
+
+    prompt = _build_page_prompt(business_name, niche, location, page_topic, keywords)
 
     try:
-        # Adhering to the rule of using the most cost-effective model
-        model = genai.GenerativeModel('gemini-2.0-flash-lite-001')
-        response = model.generate_content(prompt)
-        return response.text
+        request_options = {"timeout": timeout} if timeout else None
+        return await cached_generate_content_async(prompt, regenerate=regenerate, request_options=request_options)
     except Exception as e:
         print(f"An error occurred during content generation: {e}")
-        return f"<h1>Error Generating Content</h1><p>An error occurred while trying to generate content for the {page_topic} page.</p>"
+        if raise_on_error:
+            raise
+        return fallback_page_content(page_topic)
+
+
+async def stream_page_content_tool_async(
+    business_name: str,
+    niche: str,
+    location: str,
+    page_topic: str,
+    keywords: list = None,
+    timeout: Optional[float] = None,
+    regenerate: bool = False
+) -> AsyncIterator[str]:
+    """
+    Streams a page of content from the Gemini API as it is generated.
+
+    Takes the same arguments as `generate_page_content_tool`, but yields the HTML in
+    chunks as soon as the model produces them, or in a single chunk on a cache hit. Errors
+    are raised to the caller, which decides how to report a page that stopped part-way through.
+    """
+    print(f"--- Streaming content for '{page_topic}' page for '{business_name}' ---")
+
+    prompt = _build_page_prompt(business_name, niche, location, page_topic, keywords)
+
+    request_options = {"timeout": timeout} if timeout else None
+    async for text in cached_stream_content_async(prompt, regenerate=regenerate, request_options=request_options):
+        yield text
 
 # This allows us to test the tool directly
 if __name__ == '__main__':
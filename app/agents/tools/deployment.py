@@ -0,0 +1,237 @@
+# File: app/agents/tools/deployment.py
+# Author: MCP Development Core
+# Description: A tool for deploying a static site to Netlify.
+
+import os
+import time
+import hashlib
+import mimetypes
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import httpx
+from dotenv import load_dotenv
+
+from app.agents.tools.site_artifact import SiteArtifact
+
+load_dotenv()
+
+# Overrides the API base URL, e.g. to point at a local stand-in.
+NETLIFY_API_BASE = os.getenv("NETLIFY_API_BASE", "https://api.netlify.com/api/v1").rstrip("/")
+
+# Required files are uploaded this many at a time; each upload is retried on a network
+# error, 429 or 5xx. Site and deploy creation are only retried when they can't have taken effect.
+NETLIFY_UPLOAD_CONCURRENCY = int(os.getenv("NETLIFY_UPLOAD_CONCURRENCY", "8"))
+NETLIFY_MAX_RETRIES = int(os.getenv("NETLIFY_MAX_RETRIES", "3"))
+NETLIFY_RETRY_BACKOFF_SECONDS = float(os.getenv("NETLIFY_RETRY_BACKOFF_SECONDS", "0.5"))
+NETLIFY_HASH_WORKERS = int(os.getenv("NETLIFY_HASH_WORKERS", "8"))
+
+# One client per process, so deploys reuse pooled keep-alive connections. Users deploy
+# with their own API keys, so the Authorization header is set per request.
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=60.0,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=NETLIFY_UPLOAD_CONCURRENCY)
+                )
+    return _client
+
+def _calculate_sha1(filepath: Path) -> str:
+    """Calculates the SHA1 hash of a file."""
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        while True:
+            data = f.read(65536)
+            if not data:
+                break
+            sha1.update(data)
+    return sha1.hexdigest()
+
+def build_file_manifest(site_dir: Path, max_workers: int = NETLIFY_HASH_WORKERS) -> Dict[str, str]:
+    """
+    Returns the deploy manifest of a directory: {"/relative/path": sha1}.
+
+    Files are hashed in parallel; hashlib releases the GIL while it digests large buffers.
+    """
+    filepaths = [filepath for filepath in site_dir.rglob('*') if filepath.is_file()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = executor.map(_calculate_sha1, filepaths)
+        return {
+            f"/{filepath.relative_to(site_dir).as_posix()}": sha
+            for filepath, sha in zip(filepaths, digests)
+        }
+
+def index_by_sha(files: Dict[str, str]) -> Dict[str, List[str]]:
+    """Inverts a manifest into {sha1: [paths]}, so each required SHA is found in one lookup."""
+    index: Dict[str, List[str]] = {}
+    for path, sha in files.items():
+        index.setdefault(sha, []).append(path)
+    return index
+
+# Failures that happen before the request reaches Netlify; retrying them can't repeat its effect.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def _is_retryable(error: Exception, idempotent: bool) -> bool:
+    if isinstance(error, _NOT_SENT_ERRORS):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        # A 429 was rejected before it was processed, so it is safe to send again either way.
+        return error.response.status_code == 429 or (idempotent and error.response.status_code >= 500)
+    return idempotent and isinstance(error, httpx.TransportError)
+
+def _request_with_retry(method: str, url: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """
+    Sends a request on the pooled client, retrying transient failures with backoff.
+
+    A request that isn't idempotent (e.g. one that creates a site) is retried only when it
+    never reached Netlify or was rate limited. After a read timeout or a 5xx it may already
+    have taken effect, and sending it again could create a duplicate.
+    """
+    for attempt in range(NETLIFY_MAX_RETRIES + 1):
+        try:
+            response = _get_client().request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+        except Exception as e:
+            if not _is_retryable(e, idempotent) or attempt == NETLIFY_MAX_RETRIES:
+                raise
+        print(f"  > Netlify request to {url} failed (attempt {attempt + 1}), retrying...")
+        time.sleep(NETLIFY_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+def deploy_files_to_netlify(
+    files: Dict[str, str],
+    read_file: Callable[[str], bytes],
+    netlify_api_key: str,
+    site_id: Optional[str] = None,
+    upload_concurrency: int = NETLIFY_UPLOAD_CONCURRENCY,
+    content_type: Optional[Callable[[str], str]] = None
+) -> dict:
+    """
+    Deploys a set of files to Netlify with the file digest API.
+
+    Args:
+        files: The deploy manifest, {"/path": sha1}.
+        read_file: Returns the bytes of a manifest path; called only for files Netlify
+                   doesn't already have.
+        netlify_api_key: The user's Netlify API key.
+        site_id: The Netlify site to update. A new site is created if it's not given.
+        upload_concurrency: How many required files are uploaded at a time.
+        content_type: Returns the MIME type of a manifest path; guessed from the
+                      extension if it's not given.
+
+    Returns:
+        A dictionary with "success", "site_id", "deploy_id", "url" and "uploaded_files",
+        or a dictionary with an "error" key.
+    """
+    if not netlify_api_key:
+        return {"error": "Netlify API key is missing."}
+
+    headers = {"Authorization": f"Bearer {netlify_api_key}"}
+    content_type = content_type or (lambda path: mimetypes.guess_type(path)[0] or 'application/octet-stream')
+
+    try:
+        # --- Step 1: Create a new site OR use existing site_id ---
+        if not site_id:
+            print("  > No site_id provided. Creating a new site on Netlify...")
+            site_creation_payload = {"name": f"mcp-asset-{uuid.uuid4().hex[:8]}"}
+            response = _request_with_retry(
+                "POST", f"{NETLIFY_API_BASE}/sites", idempotent=False, json=site_creation_payload, headers=headers
+            )
+            site_data = response.json()
+            site_id = site_data['id']
+            print(f"  > Successfully created Netlify site: {site_id}")
+        else:
+            print(f"  > Existing site_id provided ({site_id}). Fetching site data...")
+            response = _request_with_retry("GET", f"{NETLIFY_API_BASE}/sites/{site_id}", headers=headers)
+            site_data = response.json()
+
+        # --- Step 2: Create a new deploy for the site ---
+        deploy_payload = {"files": files}
+        response = _request_with_retry(
+            "POST", f"{NETLIFY_API_BASE}/sites/{site_id}/deploys", idempotent=False, json=deploy_payload, headers=headers
+        )
+        deploy_data = response.json()
+        deploy_id = deploy_data['id']
+        required_files = deploy_data.get('required', [])
+        print(f"  > Created deploy {deploy_id}. Required files: {len(required_files)}")
+
+        # --- Step 3: Upload required files ---
+        # Files with identical content share a SHA; Netlify needs it uploaded only once.
+        paths_by_sha = index_by_sha(files)
+        uploads = [paths_by_sha[sha][0] for sha in required_files if sha in paths_by_sha]
+
+        def upload(path: str):
+            _request_with_retry(
+                "PUT",
+                f"{NETLIFY_API_BASE}/deploys/{deploy_id}/files{path}",
+                content=read_file(path),
+                headers={**headers, "Content-Type": content_type(path)}
+            )
+
+        if uploads:
+            with ThreadPoolExecutor(max_workers=max(1, min(upload_concurrency, len(uploads)))) as executor:
+                # list() re-raises the first failed upload.
+                list(executor.map(upload, uploads))
+            print(f"  > Uploaded {len(uploads)} files.")
+
+        print(f"--- Deployment successful! Site URL: {site_data['ssl_url']} ---")
+        return {
+            "success": True,
+            "site_id": site_id,
+            "deploy_id": deploy_id,
+            "url": site_data['ssl_url'],
+            "uploaded_files": len(uploads)
+        }
+
+    except httpx.RequestError as e:
+        return {"error": f"HTTP request failed: {e.__class__.__name__} - {e.request.url}"}
+    except httpx.HTTPStatusError as e:
+        return {"error": f"HTTP Error: {e.response.status_code} - {e.response.text}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e}"}
+
+def deploy_to_netlify_tool(
+    directory_path: str,
+    netlify_api_key: str,
+    site_id: Optional[str] = None # Added optional site_id for re-deployments
+) -> dict:
+    """
+    Deploys a directory of static files to Netlify. If a site_id is provided,
+    it updates the existing site. Otherwise, it creates a new one.
+    """
+    site_dir = Path(directory_path)
+    try:
+        files = build_file_manifest(site_dir)
+    except OSError as e:
+        return {"error": f"Could not read the site directory: {e}"}
+    return deploy_files_to_netlify(
+        files,
+        lambda path: (site_dir / path.lstrip('/')).read_bytes(),
+        netlify_api_key,
+        site_id=site_id
+    )
+
+def deploy_artifact_to_netlify(
+    artifact: SiteArtifact,
+    netlify_api_key: str,
+    site_id: Optional[str] = None
+) -> dict:
+    """
+    Deploys a site built in memory. The manifest uses the SHA1s computed at build time and
+    uploads send the artifact's own buffers, so nothing touches the disk.
+    """
+    return deploy_files_to_netlify(
+        artifact.manifest(),
+        artifact.read,
+        netlify_api_key,
+        site_id=site_id,
+        content_type=artifact.content_type
+    )
@@ -3,15 +3,75 @@
 # Description: A tool for the Market Opportunity Finder agent that performs a Google search.
 
 import os
+import re
 import json
+import threading
+import httplib2
+import httpx
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 
+from app.agents.tools.async_http import LoopBoundAsyncClient
+from app.agents.tools.response_cache import TieredCache
+from app.metrics import track_dependency
+
 # Load environment variables from .env file
 load_dotenv()
 
-def google_search_tool(query: str, num_results: int = 10) -> list:
+# Overrides the Custom Search host, e.g. to point at the local stand-in used by the benchmarks.
+GOOGLE_SEARCH_API_ENDPOINT = os.getenv("GOOGLE_SEARCH_API_ENDPOINT")
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+search_cache = TieredCache("search", ttl_seconds=SEARCH_CACHE_TTL_SECONDS, max_memory_entries=512)
+
+# The discovery-based service is built once per process from the bundled discovery
+# document. httplib2 connections are not thread-safe, so each thread executes
+# requests over its own Http object.
+_service = None
+_service_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def _get_service(api_key: str):
+    """Returns the process-wide Custom Search service, building it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                client_options = {"api_endpoint": GOOGLE_SEARCH_API_ENDPOINT} if GOOGLE_SEARCH_API_ENDPOINT else None
+                _service = build(
+                    "customsearch", "v1",
+                    developerKey=api_key,
+                    static_discovery=True,
+                    cache_discovery=False,
+                    client_options=client_options
+                )
+    return _service
+
+
+def _get_http() -> httplib2.Http:
+    """Returns this thread's HTTP connection for executing search requests."""
+    if not hasattr(_thread_local, "http"):
+        _thread_local.http = httplib2.Http(timeout=10)
+    return _thread_local.http
+
+
+# The async search calls the JSON API directly over a pooled httpx client.
+SEARCH_REST_BASE_URL = (GOOGLE_SEARCH_API_ENDPOINT or "https://www.googleapis.com").rstrip("/")
+_async_clients = LoopBoundAsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+)
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes case, comma spacing and whitespace so equivalent queries share a cache entry."""
+    query = re.sub(r"\s*,\s*", ", ", query.lower())
+    return re.sub(r"\s+", " ", query).strip(" ,.!?")
+
+
+def google_search_tool(query: str, num_results: int = 10, use_cache: bool = True) -> list:
     """
     Performs a Google search using the Custom Search JSON API and returns
     the top results.
@@ -19,6 +79,8 @@ def google_search_tool(query: str, num_results: int = 10) -> list:
     Args:
         query: The search query string.
         num_results: The number of results to return (max 10).
+        use_cache: Serve a recent result for the same normalized query from the cache.
+                   A fresh result is cached either way.
 
     Returns:
         A list of search result items, or an empty list if an error occurs.
@@ -32,14 +94,26 @@ def google_search_tool(query: str, num_results: int = 10) -> list:
         print("Error: GOOGLE_API_KEY and GOOGLE_SEARCH_ENGINE_ID must be set in .env")
         return []
 
+    normalized_query = normalize_query(query)
+    cache_key = TieredCache.make_key(search_engine_id, normalized_query, num_results)
+    if use_cache:
+        cached_items = search_cache.get(cache_key)
+        if cached_items is not None:
+            return cached_items
+
     try:
-        service = build("customsearch", "v1", developerKey=api_key)
-        result = service.cse().list(
-            q=query,
-            cx=search_engine_id,
-            num=num_results
-        ).execute()
-        return result.get('items', [])
+        service = _get_service(api_key)
+        with track_dependency("google_search", "cse.list"):
+            result = service.cse().list(
+                q=query,
+                cx=search_engine_id,
+                num=num_results
+            ).execute(http=_get_http())
+        items = result.get('items', [])
+        # Don't cache empty results; they are more likely a transient problem than a real answer.
+        if items:
+            search_cache.set(cache_key, items)
+        return items
     except HttpError as e:
         print(f"An error occurred during Google Search: {e}")
         return []
@@ -47,6 +121,47 @@ def google_search_tool(query: str, num_results: int = 10) -> list:
         print(f"A non-HTTP error occurred: {e}")
         return []
 
+
+async def google_search_tool_async(query: str, num_results: int = 10, use_cache: bool = True) -> list:
+    """
+    Async counterpart of `google_search_tool`, sharing its cache.
+
+    Returns:
+        A list of search result items, or an empty list if an error occurs.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    search_engine_id = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
+
+    if not api_key or not search_engine_id:
+        print("Error: GOOGLE_API_KEY and GOOGLE_SEARCH_ENGINE_ID must be set in .env")
+        return []
+
+    cache_key = TieredCache.make_key(search_engine_id, normalize_query(query), num_results)
+    if use_cache:
+        cached_items = await search_cache.aget(cache_key)
+        if cached_items is not None:
+            return cached_items
+
+    try:
+        with track_dependency("google_search", "cse.list"):
+            response = await _async_clients.get().get(
+                f"{SEARCH_REST_BASE_URL}/customsearch/v1",
+                params={"cx": search_engine_id, "q": query, "num": num_results},
+                # In a header rather than the query string, so it never appears in an error's URL.
+                headers={"x-goog-api-key": api_key}
+            )
+            response.raise_for_status()
+        items = response.json().get('items', [])
+        if items:
+            await search_cache.aset(cache_key, items)
+        return items
+    except httpx.HTTPStatusError as e:
+        print(f"An error occurred during Google Search: {e}")
+        return []
+    except Exception as e:
+        print(f"A non-HTTP error occurred: {e}")
+        return []
+
 # This allows us to test the tool directly
 if __name__ == '__main__':
     # CORRECTED: Updated function name in the print statement
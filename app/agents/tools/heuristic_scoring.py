@@ -0,0 +1,129 @@
+# File: app/agents/tools/heuristic_scoring.py
+# Author: MCP Development Core
+# Description: A deterministic, local opportunity score computed from competitors' on-page SEO signals.
+
+import os
+import re
+import statistics
+from typing import Dict, List
+
+# Titles that say nothing about the business are a sign of a low-effort site.
+GENERIC_TITLES = {
+    "home", "homepage", "home page", "welcome", "index", "untitled", "services", "our services",
+    "about", "about us", "contact", "contact us", "n/a", ""
+}
+MIN_TITLE_CHARS = 15
+MIN_META_DESCRIPTION_CHARS = 50
+MIN_H2S = 3
+
+# Each feature is 1.0 when a competitor shows the weakness and 0.0 when it doesn't. The
+# weights sum to 1, so a market of competitors showing every weakness scores 100.
+FEATURE_WEIGHTS: Dict[str, float] = {
+    "weak_title": 0.25,
+    "missing_meta_description": 0.20,
+    "missing_h1": 0.15,
+    "sparse_h2s": 0.20,
+    "title_missing_niche": 0.10,
+    "no_location_targeting": 0.10,
+}
+
+FEATURE_DESCRIPTIONS = {
+    "weak_title": "have weak or generic titles",
+    "missing_meta_description": "lack a useful meta description",
+    "missing_h1": "have no H1",
+    "sparse_h2s": f"have fewer than {MIN_H2S} H2 headings",
+    "title_missing_niche": "don't mention the niche in their title",
+    "no_location_targeting": "don't mention the location in their title or H1",
+}
+
+# Scores inside this band are too close to call on mechanical signals alone.
+HEURISTIC_AMBIGUOUS_LOW = float(os.getenv("HEURISTIC_AMBIGUOUS_LOW", "40"))
+HEURISTIC_AMBIGUOUS_HIGH = float(os.getenv("HEURISTIC_AMBIGUOUS_HIGH", "75"))
+# Competitors this far apart (standard deviation of their individual scores) disagree too
+# much for a confident average.
+HEURISTIC_MAX_SPREAD = float(os.getenv("HEURISTIC_MAX_SPREAD", "30"))
+HEURISTIC_MIN_COMPETITORS = 2
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _mentions(text: str, phrase: str) -> bool:
+    """True if `text` contains any significant word of `phrase` (plural forms included)."""
+    words = set(_words(text))
+    for word in _words(phrase):
+        if len(word) > 2 and (word in words or word + "s" in words or word.rstrip("s") in words):
+            return True
+    return False
+
+
+def competitor_features(result: dict, niche: str, location: str) -> List[float]:
+    """Returns one competitor's feature vector, in FEATURE_WEIGHTS order."""
+    title = (result.get("title") or "").strip()
+    meta_description = (result.get("meta_description") or "").strip()
+    h1 = (result.get("h1") or "").strip()
+    h2s = result.get("h2s") or []
+
+    features = {
+        "weak_title": title.lower() in GENERIC_TITLES or len(title) < MIN_TITLE_CHARS,
+        "missing_meta_description": meta_description == "N/A" or len(meta_description) < MIN_META_DESCRIPTION_CHARS,
+        "missing_h1": h1 in ("", "N/A"),
+        "sparse_h2s": len(h2s) < MIN_H2S,
+        "title_missing_niche": not _mentions(title, niche),
+        "no_location_targeting": not (_mentions(title, location) or _mentions(h1, location)),
+    }
+    return [float(features[name]) for name in FEATURE_WEIGHTS]
+
+
+def heuristic_score(niche: str, location: str, analysis_data: List[dict]) -> dict:
+    """
+    Scores a market from its competitors' analyses without calling an LLM.
+
+    Every competitor becomes a row of weakness features; the rows are weighted into a
+    per-competitor score and averaged into the market's Opportunity Score. The result is
+    `ambiguous` when the score falls in the HEURISTIC_AMBIGUOUS band, the competitors
+    disagree strongly, or there are too few of them. Those markets need the LLM.
+
+    Returns:
+        A dictionary with "opportunity_score", "justification", "ambiguous" and
+        "feature_rates" (the share of competitors showing each weakness).
+    """
+    if not analysis_data:
+        return {"opportunity_score": None, "justification": "No competitor data.", "ambiguous": True, "feature_rates": {}}
+
+    weights = list(FEATURE_WEIGHTS.values())
+    matrix = [competitor_features(result, niche, location) for result in analysis_data]
+    competitor_scores = [100 * sum(w * f for w, f in zip(weights, row)) for row in matrix]
+    # Column means: how common each weakness is across the market.
+    rates = [sum(column) / len(matrix) for column in zip(*matrix)]
+    score = round(statistics.fmean(competitor_scores))
+    spread = statistics.pstdev(competitor_scores)
+
+    ambiguous = (
+        HEURISTIC_AMBIGUOUS_LOW < score < HEURISTIC_AMBIGUOUS_HIGH
+        or spread > HEURISTIC_MAX_SPREAD
+        or len(analysis_data) < HEURISTIC_MIN_COMPETITORS
+    )
+
+    feature_rates = dict(zip(FEATURE_WEIGHTS, rates))
+    notable = sorted(
+        ((rate, name) for name, rate in feature_rates.items() if rate >= 0.5), reverse=True
+    )
+    if notable:
+        findings = "; ".join(
+            f"{round(rate * len(matrix))} of {len(matrix)} competitors {FEATURE_DESCRIPTIONS[name]}"
+            for rate, name in notable
+        )
+    else:
+        findings = f"most of the {len(matrix)} competitors have solid on-page SEO basics"
+    verdict = "a likely Digital Desert" if score >= HEURISTIC_AMBIGUOUS_HIGH else (
+        "a likely Digital Oasis" if score <= HEURISTIC_AMBIGUOUS_LOW else "a mixed market")
+    justification = f"Preliminary on-page signal score: {verdict}. {findings[0].upper() + findings[1:]}."
+
+    return {
+        "opportunity_score": score,
+        "justification": justification,
+        "ambiguous": ambiguous,
+        "feature_rates": feature_rates
+    }
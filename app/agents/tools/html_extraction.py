@@ -0,0 +1,265 @@
+# File: app/agents/tools/html_extraction.py
+# Author: MCP Development Core
+# Description: Pluggable, incremental extractors for the on-page SEO fields of a competitor page.
+
+import os
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Type
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the streaming extractor needs only the standard library.
+    etree = None
+
+from bs4 import BeautifulSoup
+
+# Which extractor to use: "auto" (lxml when installed, otherwise "stream"), "lxml", "stream" or "bs4".
+HTML_EXTRACTION_BACKEND = os.getenv("HTML_EXTRACTION_BACKEND", "auto")
+
+# Stop collecting H2s after this many. Scoring shows at most this many per competitor and only
+# needs a few to tell a sparse page, so once the other fields are known the download can stop.
+MAX_H2S = int(os.getenv("MAX_H2S", "15"))
+
+# Elements that never have an end tag, so they are never left open.
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "meta",
+    "param", "source", "track", "wbr"
+))
+
+
+def _join_text(fragments: List[str]) -> str:
+    """Joins text the way BeautifulSoup's get_text(strip=True) does, so every backend agrees."""
+    return "".join(fragment.strip() for fragment in fragments if fragment.strip())
+
+
+class SeoExtractor(ABC):
+    """
+    The extractor interface. Feed the page in chunks as it downloads, then call close().
+
+    `is_complete` turns True once nothing further in the document can change the result
+    (the title, meta description and H1 are known and MAX_H2S H2s have closed), so the
+    caller can stop downloading.
+    """
+
+    def __init__(self):
+        self.is_complete = False
+
+    @abstractmethod
+    def feed(self, chunk: str):
+        """Parses the next chunk of the page."""
+
+    @abstractmethod
+    def close(self) -> Dict[str, object]:
+        """Finishes parsing and returns the title, meta_description, h1 and h2s fields."""
+
+
+class StreamingSeoExtractor(SeoExtractor, HTMLParser):
+    """
+    An event-based extractor on the standard library's HTMLParser. It never builds a tree.
+
+    Like the tree-based backends, it keeps every open title or heading collecting text at
+    once (an <h1> inside an open <h2> is captured by both), reports headings in the order
+    they start, and keeps the text of elements still open at the end of the input. It
+    tracks the names of the open elements, so an end tag closes whatever is still open
+    inside that element, and an end tag with no open match (e.g. </h3> for an <h2>) is
+    ignored.
+    """
+
+    def __init__(self):
+        SeoExtractor.__init__(self)
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.h1: Optional[str] = None
+        self.h2s: List[Optional[str]] = []
+        self._claimed = set()
+        # The names of the open elements, outermost first.
+        self._stack: List[str] = []
+        # The elements collecting text, outermost first: [tag, depth in _stack, fragments, index into h2s].
+        self._open: List[list] = []
+        # True while data events continue the same text node (it can be split across chunks).
+        self._in_text = False
+
+    def handle_starttag(self, tag, attrs):
+        self._in_text = False
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(tag)
+        self._start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        # A self-closing tag opens nothing.
+        self._in_text = False
+        self._start(tag, attrs)
+
+    def _start(self, tag, attrs):
+        depth = len(self._stack) - 1
+        if tag == "meta" and self.meta_description is None:
+            attributes = dict(attrs)
+            if (attributes.get("name") or "").lower() == "description":
+                self.meta_description = (attributes.get("content") or "").strip() or "N/A"
+        elif tag in ("title", "h1") and tag not in self._claimed:
+            # The first one in the document wins, even if a later one closes first.
+            self._claimed.add(tag)
+            self._open.append([tag, depth, [], None])
+        elif tag == "h2" and len(self.h2s) < MAX_H2S:
+            # The slot is reserved now, so H2s stay in document order when they nest.
+            self.h2s.append(None)
+            self._open.append([tag, depth, [], len(self.h2s) - 1])
+        self._check_complete()
+
+    def handle_endtag(self, tag):
+        self._in_text = False
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth] == tag:
+                # Closing an element also closes everything still open inside it.
+                del self._stack[depth:]
+                while self._open and self._open[-1][1] >= depth:
+                    self._finish(self._open.pop())
+                break
+        self._check_complete()
+
+    def handle_data(self, data):
+        # Pieces of one text node are joined before stripping, as get_text(strip=True) sees them.
+        for capture in self._open:
+            if self._in_text and capture[2]:
+                capture[2][-1] += data
+            else:
+                capture[2].append(data)
+        self._in_text = True
+
+    def handle_comment(self, data):
+        self._in_text = False
+
+    def _finish(self, capture: list):
+        tag, _, fragments, h2_index = capture
+        text = _join_text(fragments)
+        if tag == "title":
+            self.title = text
+        elif tag == "h1":
+            self.h1 = text
+        else:
+            self.h2s[h2_index] = text
+
+    def _check_complete(self):
+        if self.title is not None and self.meta_description is not None and self.h1 is not None \
+                and len(self.h2s) >= MAX_H2S and not self._open:
+            self.is_complete = True
+
+    def feed(self, chunk: str):
+        if not self.is_complete:
+            HTMLParser.feed(self, chunk)
+
+    def close(self) -> Dict[str, object]:
+        if not self.is_complete:
+            HTMLParser.close(self)
+        # Elements still open here were cut off (e.g. at MAX_PAGE_BYTES); keep what they have.
+        while self._open:
+            self._finish(self._open.pop())
+        return {
+            "title": self.title if self.title is not None else "N/A",
+            "meta_description": self.meta_description or "N/A",
+            "h1": self.h1 if self.h1 is not None else "N/A",
+            "h2s": [h2 for h2 in self.h2s if h2 is not None]
+        }
+
+
+class LxmlSeoExtractor(SeoExtractor):
+    """An incremental extractor on lxml's C parser, reading elements as they close."""
+
+    def __init__(self):
+        if etree is None:
+            raise RuntimeError("The lxml extractor requires the 'lxml' package.")
+        super().__init__()
+        self._parser = etree.HTMLPullParser(events=("start", "end"), tag=("title", "meta", "h1", "h2"))
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.h1: Optional[str] = None
+        self.h2s: List[Optional[str]] = []
+        # H2s get their slot when they start, so nested ones stay in document order.
+        self._h2_slots = {}
+        self._open = 0
+
+    def _read_events(self):
+        for event, element in self._parser.read_events():
+            tag = element.tag
+            if event == "start":
+                if tag == "h2" and len(self.h2s) < MAX_H2S:
+                    self._h2_slots[element] = len(self.h2s)
+                    self.h2s.append(None)
+                if tag in ("title", "h1", "h2"):
+                    self._open += 1
+                continue
+            if tag in ("title", "h1", "h2"):
+                self._open -= 1
+            if tag == "meta":
+                if self.meta_description is None and (element.get("name") or "").lower() == "description":
+                    self.meta_description = (element.get("content") or "").strip() or "N/A"
+            elif tag == "title" and self.title is None:
+                self.title = _join_text(list(element.itertext()))
+            elif tag == "h1" and self.h1 is None:
+                self.h1 = _join_text(list(element.itertext()))
+            elif tag == "h2" and element in self._h2_slots:
+                self.h2s[self._h2_slots.pop(element)] = _join_text(list(element.itertext()))
+
+        if self.title is not None and self.meta_description is not None and self.h1 is not None \
+                and len(self.h2s) >= MAX_H2S and not self._open:
+            self.is_complete = True
+
+    def feed(self, chunk: str):
+        if not self.is_complete:
+            self._parser.feed(chunk)
+            self._read_events()
+
+    def close(self) -> Dict[str, object]:
+        if not self.is_complete:
+            self._parser.close()
+            self._read_events()
+        return {
+            "title": self.title if self.title is not None else "N/A",
+            "meta_description": self.meta_description or "N/A",
+            "h1": self.h1 if self.h1 is not None else "N/A",
+            "h2s": [h2 for h2 in self.h2s if h2 is not None]
+        }
+
+
+class BeautifulSoupSeoExtractor(SeoExtractor):
+    """The original full-tree extractor, kept for comparison in benchmarks."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[str] = []
+
+    def feed(self, chunk: str):
+        self._chunks.append(chunk)
+
+    def close(self) -> Dict[str, object]:
+        soup = BeautifulSoup("".join(self._chunks), 'html.parser')
+        title_tag = soup.find('title')
+        meta_description_tag = soup.find('meta', attrs={'name': 'description'})
+        h1_tag = soup.find('h1')
+        return {
+            "title": title_tag.get_text(strip=True) if title_tag else 'N/A',
+            "meta_description": (meta_description_tag.get('content') or '').strip() or 'N/A'
+                                if meta_description_tag else 'N/A',
+            "h1": h1_tag.get_text(strip=True) if h1_tag else 'N/A',
+            "h2s": [h2.get_text(strip=True) for h2 in soup.find_all('h2', limit=MAX_H2S)]
+        }
+
+
+EXTRACTORS: Dict[str, Type[SeoExtractor]] = {
+    "stream": StreamingSeoExtractor,
+    "bs4": BeautifulSoupSeoExtractor,
+}
+if etree is not None:
+    EXTRACTORS["lxml"] = LxmlSeoExtractor
+
+
+def create_extractor(backend: Optional[str] = None) -> SeoExtractor:
+    """Returns a new extractor for the requested backend (HTML_EXTRACTION_BACKEND by default)."""
+    backend = backend or HTML_EXTRACTION_BACKEND
+    if backend == "auto":
+        backend = "lxml" if "lxml" in EXTRACTORS else "stream"
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown or unavailable HTML extraction backend '{backend}'.")
+    return EXTRACTORS[backend]()
@@ -0,0 +1,232 @@
+# File: app/agents/tools/llm_cache.py
+# Author: MCP Development Core
+# Description: Cached Gemini calls, so repeated prompts skip the model entirely.
+
+import os
+import json
+from typing import Any, AsyncIterator, Callable, Optional
+import httpx
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from app.agents.tools.async_http import LoopBoundAsyncClient
+from app.agents.tools.response_cache import TieredCache
+from app.metrics import track_dependency
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure the Gemini API key. GEMINI_API_ENDPOINT overrides the API host (over REST),
+# e.g. to point at the local stand-in used by the benchmarks.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+if GEMINI_API_ENDPOINT:
+    genai.configure(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        transport="rest",
+        client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+    )
+else:
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+# The async calls go straight to the REST API: over REST, the SDK's async methods still
+# make blocking requests, which would stall the event loop.
+GEMINI_REST_BASE_URL = (GEMINI_API_ENDPOINT or "https://generativelanguage.googleapis.com").rstrip("/")
+if "://" not in GEMINI_REST_BASE_URL:
+    GEMINI_REST_BASE_URL = f"https://{GEMINI_REST_BASE_URL}"
+GEMINI_REST_API_VERSION = "v1beta"
+GEMINI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("GEMINI_REQUEST_TIMEOUT_SECONDS", "120"))
+
+# Adhering to the rule of using the most cost-effective model
+DEFAULT_MODEL = 'gemini-2.0-flash-lite-001'
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+llm_cache = TieredCache(
+    "llm",
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256")),
+    max_disk_entries=int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
+)
+
+
+# Many calls may wait on Gemini at once, but only a few idle connections are kept: the
+# pool gets slower the more keep-alive connections it has to scan.
+_async_clients = LoopBoundAsyncClient(
+    timeout=GEMINI_REQUEST_TIMEOUT_SECONDS,
+    limits=httpx.Limits(max_connections=500, max_keepalive_connections=20)
+)
+
+
+def _cache_key(model_name: str, prompt: str, generation_config: Optional[dict] = None) -> str:
+    key_parts = (model_name, prompt)
+    if generation_config:
+        key_parts += (json.dumps(generation_config, sort_keys=True),)
+    return TieredCache.make_key(*key_parts)
+
+
+def _rest_request(model_name: str, method: str, prompt: str, generation_config: Optional[dict]) -> tuple:
+    """Returns the URL and JSON body of a REST call, mirroring what the SDK sends."""
+    url = f"{GEMINI_REST_BASE_URL}/{GEMINI_REST_API_VERSION}/models/{model_name}:{method}"
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if generation_config:
+        # The REST API spells the config keys in camelCase.
+        body["generationConfig"] = {
+            "".join(word.capitalize() if i else word for i, word in enumerate(key.split("_"))): value
+            for key, value in generation_config.items()
+        }
+    return url, body
+
+
+def _response_text(payload: dict) -> str:
+    """Joins the text parts of the first candidate, failing like the SDK's `response.text`."""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        block_reason = (payload.get("promptFeedback") or {}).get("blockReason")
+        raise ValueError(f"Gemini returned no candidates (block reason: {block_reason}).")
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    if not parts:
+        raise ValueError(f"Gemini returned an empty candidate (finish reason: {candidates[0].get('finishReason')}).")
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _auth_headers() -> dict:
+    # The key goes in a header, as the SDK sends it: a `?key=` query parameter would end up
+    # in the URL of every HTTPStatusError message.
+    return {"x-goog-api-key": os.getenv("GOOGLE_API_KEY") or ""}
+
+
+def _timeout(request_options: Optional[dict]):
+    return (request_options or {}).get("timeout") or GEMINI_REQUEST_TIMEOUT_SECONDS
+
+
+def cached_generate_content(
+    prompt: str,
+    model_name: str = DEFAULT_MODEL,
+    regenerate: bool = False,
+    request_options: Optional[dict] = None,
+    parse: Optional[Callable[[str], Any]] = None,
+    generation_config: Optional[dict] = None
+) -> Any:
+    """
+    Calls Gemini with `prompt`, reusing a cached response for an identical prompt.
+
+    Args:
+        prompt: The full prompt. The cache key is derived from it and the model name.
+        model_name: The Gemini model to call on a cache miss.
+        regenerate: Skip the cache lookup and call the model; the fresh response replaces
+                    the cached one.
+        request_options: Passed through to `generate_content` (e.g. a timeout).
+        parse: An optional function applied to the response text. If it raises, the
+               response is not cached and the error propagates, so a malformed answer
+               is never served from the cache.
+        generation_config: Passed through to `generate_content`, e.g.
+                           {"response_mime_type": "application/json"}. It is part of the cache key.
+
+    Returns:
+        The response text, or the result of `parse` on it.
+    """
+    key = _cache_key(model_name, prompt, generation_config)
+    if not regenerate:
+        cached_text = llm_cache.get(key)
+        if cached_text is not None:
+            return parse(cached_text) if parse else cached_text
+
+    model = genai.GenerativeModel(model_name)
+    with track_dependency("gemini", "generate_content"):
+        response = model.generate_content(
+            prompt, generation_config=generation_config, request_options=request_options
+        )
+        text = response.text
+    result = parse(text) if parse else text
+    llm_cache.set(key, text)
+    return result
+
+
+async def cached_generate_content_async(
+    prompt: str,
+    model_name: str = DEFAULT_MODEL,
+    regenerate: bool = False,
+    request_options: Optional[dict] = None,
+    parse: Optional[Callable[[str], Any]] = None,
+    generation_config: Optional[dict] = None
+) -> Any:
+    """
+    Async counterpart of `cached_generate_content`, sharing its cache entries.
+
+    The model is called over the REST API with a pooled `httpx.AsyncClient`, so waiting
+    for Gemini holds no thread. Only the "timeout" of `request_options` is used.
+    """
+    key = _cache_key(model_name, prompt, generation_config)
+    if not regenerate:
+        cached_text = await llm_cache.aget(key)
+        if cached_text is not None:
+            return parse(cached_text) if parse else cached_text
+
+    url, body = _rest_request(model_name, "generateContent", prompt, generation_config)
+    with track_dependency("gemini", "generate_content"):
+        response = await _async_clients.get().post(
+            url, headers=_auth_headers(), json=body, timeout=_timeout(request_options)
+        )
+        response.raise_for_status()
+        text = _response_text(response.json())
+    result = parse(text) if parse else text
+    await llm_cache.aset(key, text)
+    return result
+
+
+async def cached_stream_content_async(
+    prompt: str,
+    model_name: str = DEFAULT_MODEL,
+    regenerate: bool = False,
+    request_options: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of `cached_generate_content_async`, sharing its cache entries.
+
+    A cached response is yielded as one chunk. Otherwise the model's chunks are yielded as
+    they arrive (read from the REST API's Server-Sent Events), and the full response is
+    cached only once the stream completes.
+    """
+    key = _cache_key(model_name, prompt)
+    if not regenerate:
+        cached_text = await llm_cache.aget(key)
+        if cached_text is not None:
+            yield cached_text
+            return
+
+    url, body = _rest_request(model_name, "streamGenerateContent", prompt, None)
+    chunks = []
+    block_reason = finish_reason = None
+    with track_dependency("gemini", "stream_generate_content"):
+        async with _async_clients.get().stream(
+            "POST", url,
+            params={"alt": "sse"},
+            headers=_auth_headers(),
+            json=body,
+            timeout=_timeout(request_options)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[len("data:"):])
+                block_reason = (payload.get("promptFeedback") or {}).get("blockReason") or block_reason
+                candidates = payload.get("candidates") or []
+                if candidates:
+                    finish_reason = candidates[0].get("finishReason") or finish_reason
+                # Chunks without text (e.g. a final one with only usage metadata) are skipped.
+                text = "".join(
+                    part.get("text", "")
+                    for candidate in candidates[:1]
+                    for part in (candidate.get("content") or {}).get("parts", [])
+                )
+                if text:
+                    chunks.append(text)
+                    yield text
+    # A blocked prompt or a candidate stopped for safety streams no text. Like `_response_text`,
+    # that is an error, and nothing is cached.
+    if not chunks:
+        raise ValueError(
+            f"Gemini streamed no text (block reason: {block_reason}, finish reason: {finish_reason})."
+        )
+    await llm_cache.aset(key, "".join(chunks))
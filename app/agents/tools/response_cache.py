@@ -0,0 +1,212 @@
+# File: app/agents/tools/response_cache.py
+# Author: MCP Development Core
+# Description: A two-tier (in-process LRU + local SQLite) cache for expensive external calls.
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))
+CACHE_DB_PATH = CACHE_DIR / "response_cache.sqlite3"
+
+# Expired and over-limit rows are pruned from disk once every this many writes.
+PRUNE_EVERY_N_WRITES = 50
+
+# Every cache created in this process, so their counters can be reported together.
+_registry = []
+
+
+class TieredCache:
+    """
+    A content-addressed cache with an in-process LRU tier in front of a persistent SQLite tier.
+
+    Values must be JSON-serializable. Entries expire after their TTL in both tiers, and each
+    tier is bounded by entry count with least-recently-used eviction. Several caches can share
+    one SQLite file; each keeps its rows under its own namespace. The SQLite file is safe to
+    share between worker processes on the same host.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 10000,
+        db_path: Optional[Path] = None
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = Path(db_path) if db_path else CACHE_DB_PATH
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_prune = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        _registry.append(self)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Builds a stable cache key by hashing the JSON form of the given parts."""
+        serialized = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed"
+                " ON cache_entries (namespace, accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        """Stores an entry in the memory tier, evicting the least recently used one if full."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    conn.execute(
+                        "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key)
+                    )
+                    conn.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self._stats["disk_hits"] += 1
+                    return value
+            except sqlite3.Error as e:
+                # The disk tier is an optimization; never fail the caller because of it.
+                print(f"Cache '{self.namespace}' disk read failed: {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Stores `value` under `key` in both tiers."""
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["writes"] += 1
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires_at, now)
+                )
+                conn.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= PRUNE_EVERY_N_WRITES:
+                    self._prune(conn, now)
+            except sqlite3.Error as e:
+                print(f"Cache '{self.namespace}' disk write failed: {e}")
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """
+        `get` for coroutines. The lookup runs in a worker thread, so a disk read or a wait
+        on the lock (held by another thread's write) never stalls the event loop.
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """`set` for coroutines; the SQLite write and commit run in a worker thread."""
+        await asyncio.to_thread(self.set, key, value, ttl_seconds)
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Drops expired rows, then the least recently used rows beyond the disk limit."""
+        self._writes_since_prune = 0
+        expired = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now)
+        ).rowcount
+        overflow = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE namespace = ?"
+            " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_disk_entries)
+        ).rowcount
+        conn.commit()
+        self._stats["evictions"] += expired + overflow
+
+    def delete(self, key: str):
+        """Removes `key` from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Cache '{self.namespace}' disk delete failed: {e}")
+
+    def clear(self):
+        """Removes every entry in this cache's namespace."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Returns a snapshot of this cache's hit, miss, write and eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def all_cache_stats() -> dict:
+    """Returns the counters of every cache in this process, keyed by namespace."""
+    return {cache.namespace: cache.stats() for cache in _registry}
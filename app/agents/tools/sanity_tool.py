@@ -3,28 +3,132 @@
 # Description: A tool for creating and managing content in Sanity.io.
 
 import os
-import logging
-# CORRECTED: Import the Client from the correct 'sanity.client' module
-from sanity.client import Client
+import json
+import time
+import uuid
+import threading
+from typing import List, Optional
+
+import httpx
 from dotenv import load_dotenv
 
+from app.metrics import track_dependency
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Basic logging setup for the client
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+SANITY_API_VERSION = "v2021-06-07"
+# Overrides the API host, e.g. to point at the local stand-in used by the benchmarks.
+SANITY_API_HOST = os.getenv("SANITY_API_HOST")
+
+# Large mutation sets are split into transactions bounded by both count and JSON size,
+# so a site with many (or very long) pages never exceeds the API's request limits.
+SANITY_MAX_MUTATIONS_PER_TRANSACTION = int(os.getenv("SANITY_MAX_MUTATIONS_PER_TRANSACTION", "100"))
+SANITY_MAX_TRANSACTION_BYTES = int(os.getenv("SANITY_MAX_TRANSACTION_BYTES", str(2 * 1024 * 1024)))
+# A transaction that fails with a network error, 429 or 5xx is retried this many times.
+SANITY_MAX_RETRIES = int(os.getenv("SANITY_MAX_RETRIES", "3"))
+SANITY_RETRY_BACKOFF_SECONDS = float(os.getenv("SANITY_RETRY_BACKOFF_SECONDS", "0.5"))
+
+# One client per process, so pushes reuse pooled keep-alive connections. httpx.Client
+# is thread-safe, so the task workers can share it.
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=30.0,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+                )
+    return _client
+
+def _mutate_url(project_id: str, dataset: str) -> str:
+    host = SANITY_API_HOST or f"https://{project_id}.api.sanity.io"
+    return f"{host}/{SANITY_API_VERSION}/data/mutate/{dataset}"
+
+def _query_url(project_id: str, dataset: str) -> str:
+    host = SANITY_API_HOST or f"https://{project_id}.api.sanity.io"
+    return f"{host}/{SANITY_API_VERSION}/data/query/{dataset}"
+
+def chunk_mutations(
+    mutations: List[dict],
+    max_mutations: int = SANITY_MAX_MUTATIONS_PER_TRANSACTION,
+    max_bytes: int = SANITY_MAX_TRANSACTION_BYTES
+) -> List[List[dict]]:
+    """
+    Splits mutations, in order, into transactions of at most `max_mutations` mutations
+    and roughly `max_bytes` of JSON. A single mutation larger than `max_bytes` still gets
+    a transaction of its own.
+    """
+    chunks, current, current_bytes = [], [], 0
+    for mutation in mutations:
+        size = len(json.dumps(mutation, separators=(",", ":")).encode("utf-8"))
+        if current and (len(current) >= max_mutations or current_bytes + size > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(mutation)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
 
-def sanity_tool_create_documents(documents: list) -> dict:
+def _send_transaction(url: str, api_key: str, mutations: List[dict], return_documents: bool) -> dict:
     """
-    Creates multiple documents in Sanity.io using a single transaction.
+    Sends one transaction, retrying it on transient failures.
+
+    Sanity transactions are atomic, so a 409 on a retry means an earlier attempt was
+    committed after all (its response was lost); the transaction is then treated as done.
+    """
+    for attempt in range(SANITY_MAX_RETRIES + 1):
+        try:
+            with track_dependency("sanity", "mutate"):
+                response = _get_client().post(
+                    url,
+                    params={"returnDocuments": "true" if return_documents else "false"},
+                    json={"mutations": mutations},
+                    headers={"Authorization": f"Bearer {api_key}"}
+                )
+                response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 409 and attempt > 0:
+                return {"transactionId": None, "results": [
+                    {"id": next(iter(mutation.values())).get("_id"), "operation": next(iter(mutation))}
+                    for mutation in mutations
+                ]}
+            if not _is_retryable(e) or attempt == SANITY_MAX_RETRIES:
+                raise
+        except Exception as e:
+            if not _is_retryable(e) or attempt == SANITY_MAX_RETRIES:
+                raise
+        print(f"  > Sanity transaction failed (attempt {attempt + 1}), retrying...")
+        time.sleep(SANITY_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+def sanity_tool_mutate(mutations: List[dict], return_documents: bool = False) -> dict:
+    """
+    Applies Sanity mutations, split into size-bounded transactions sent over a pooled client.
+
+    Each transaction is atomic and retried on its own, so a transient failure only resends
+    the transaction that failed. Transactions are sent in order and the first one that
+    still fails after its retries stops the push.
 
     Args:
-        documents: A list of dictionaries, where each dictionary represents a
-                   Sanity document to be created.
+        mutations: Mutation objects, e.g. {"create": {...}} or {"createOrReplace": {...}}.
+        return_documents: Ask Sanity to echo every document back in the results. Leave it
+                          off unless the caller needs the stored documents.
 
     Returns:
-        A dictionary with the results of the transaction.
+        {"success": True, "result": {"transactionIds": [...], "results": [...]}} with the
+        results of all transactions in mutation order, or a dictionary with an "error" key
+        and the partial "result" of the transactions that were committed.
     """
     project_id = os.getenv("SANITY_PROJECT_ID")
     api_key = os.getenv("SANITY_API_KEY")
@@ -33,29 +137,78 @@ def sanity_tool_create_documents(documents: list) -> dict:
     if not project_id or not api_key:
         return {"error": "SANITY_PROJECT_ID and SANITY_API_KEY must be set in .env"}
 
-    try:
-        # CORRECTED: Initialize the client using the correct class name "Client"
-        client = Client(
-            logger,
-            project_id=project_id,
-            dataset=dataset,
-            token=api_key,
-            use_cdn=False # Use False for mutations to get fresh data
-        )
-        
-        # The transaction logic needs to be a list of mutation objects
-        transactions = [{"create": doc} for doc in documents]
-            
-        result = client.mutate(
-            transactions=transactions,
-            return_documents=True
-        )
-        print(f"  > Successfully created {len(documents)} documents in Sanity.")
-        return {"success": True, "result": result}
+    url = _mutate_url(project_id, dataset)
+    merged = {"transactionIds": [], "results": []}
+    chunks = chunk_mutations(mutations)
+    for index, chunk in enumerate(chunks):
+        try:
+            result = _send_transaction(url, api_key, chunk, return_documents)
+        except Exception as e:
+            print(f"An error occurred with the Sanity API: {e}")
+            return {
+                "error": f"Sanity transaction {index + 1} of {len(chunks)} failed: {e}",
+                "result": merged
+            }
+        merged["transactionIds"].append(result.get("transactionId"))
+        merged["results"].extend(result.get("results", []))
+
+    return {"success": True, "result": merged}
+
+def sanity_tool_query(query: str, params: Optional[dict] = None) -> dict:
+    """
+    Runs a GROQ query against the dataset, retrying it on transient failures.
 
-    except Exception as e:
-        print(f"An error occurred with the Sanity API: {e}")
-        return {"error": str(e)}
+    Args:
+        query: The GROQ query, e.g. '*[_type == "page" && _id == $id]'.
+        params: Values for the query's $parameters.
+
+    Returns:
+        {"success": True, "result": <the query result>}, or a dictionary with an "error" key.
+    """
+    project_id = os.getenv("SANITY_PROJECT_ID")
+    api_key = os.getenv("SANITY_API_KEY")
+    dataset = "production" # Default dataset name
+
+    if not project_id or not api_key:
+        return {"error": "SANITY_PROJECT_ID and SANITY_API_KEY must be set in .env"}
+
+    # The HTTP API takes each parameter as a JSON-encoded "$name" query string value.
+    query_params = {"query": query, **{f"${name}": json.dumps(value) for name, value in (params or {}).items()}}
+    for attempt in range(SANITY_MAX_RETRIES + 1):
+        try:
+            with track_dependency("sanity", "query"):
+                response = _get_client().get(
+                    _query_url(project_id, dataset),
+                    params=query_params,
+                    headers={"Authorization": f"Bearer {api_key}"}
+                )
+                response.raise_for_status()
+            return {"success": True, "result": response.json().get("result")}
+        except Exception as e:
+            if not _is_retryable(e) or attempt == SANITY_MAX_RETRIES:
+                print(f"An error occurred with the Sanity API: {e}")
+                return {"error": f"Sanity query failed: {e}"}
+        print(f"  > Sanity query failed (attempt {attempt + 1}), retrying...")
+        time.sleep(SANITY_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+def sanity_tool_create_documents(documents: list, return_documents: bool = True) -> dict:
+    """
+    Creates multiple documents in Sanity.io.
+
+    Args:
+        documents: A list of dictionaries, where each dictionary represents a
+                   Sanity document to be created.
+        return_documents: Include the created documents in the results.
+
+    Returns:
+        A dictionary with the results of the transactions (see `sanity_tool_mutate`).
+    """
+    # Documents get their IDs up front, so a retried transaction cannot create duplicates.
+    transactions = [{"create": {"_id": str(uuid.uuid4()), **doc}} for doc in documents]
+    result = sanity_tool_mutate(transactions, return_documents=return_documents)
+    if result.get("success"):
+        print(f"  > Successfully created {len(documents)} documents in Sanity.")
+    return result
 
 # This allows us to test the tool directly
 if __name__ == '__main__':
@@ -3,75 +3,249 @@
 # Description: A tool for generating LocalBusiness JSON-LD schema.
 
 import os
+import re
 import json
-import google.generativeai as genai
+from functools import lru_cache
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from app.agents.tools.llm_cache import cached_generate_content
+
 # Load all environment variables from the .env file in the project root.
 load_dotenv()
 
+# The schema.org LocalBusiness subtype for common niches, keyed by normalized niche words.
+# Longer phrases are matched before single words, so "garage door repair" isn't "AutoRepair".
+NICHE_SCHEMA_TYPES = {
+    "plumber": "Plumber",
+    "plumbing": "Plumber",
+    "roofer": "RoofingContractor",
+    "roofing": "RoofingContractor",
+    "roof repair": "RoofingContractor",
+    "electrician": "Electrician",
+    "electrical": "Electrician",
+    "hvac": "HVACBusiness",
+    "heating": "HVACBusiness",
+    "air conditioning": "HVACBusiness",
+    "furnace repair": "HVACBusiness",
+    "locksmith": "Locksmith",
+    "painter": "HousePainter",
+    "house painter": "HousePainter",
+    "painting": "HousePainter",
+    "general contractor": "GeneralContractor",
+    "contractor": "GeneralContractor",
+    "remodeling": "GeneralContractor",
+    "landscaper": "HomeAndConstructionBusiness",
+    "landscaping": "HomeAndConstructionBusiness",
+    "lawn care": "HomeAndConstructionBusiness",
+    "pest control": "HomeAndConstructionBusiness",
+    "garage door repair": "HomeAndConstructionBusiness",
+    "handyman": "HomeAndConstructionBusiness",
+    "mover": "MovingCompany",
+    "moving": "MovingCompany",
+    "moving company": "MovingCompany",
+    "self storage": "SelfStorage",
+    "dentist": "Dentist",
+    "dental": "Dentist",
+    "physician": "Physician",
+    "doctor": "Physician",
+    "chiropractor": "Physician",
+    "veterinarian": "VeterinaryCare",
+    "vet": "VeterinaryCare",
+    "optician": "Optician",
+    "pharmacy": "Pharmacy",
+    "attorney": "Attorney",
+    "lawyer": "Attorney",
+    "notary": "Notary",
+    "accountant": "AccountingService",
+    "accounting": "AccountingService",
+    "insurance agent": "InsuranceAgency",
+    "insurance": "InsuranceAgency",
+    "realtor": "RealEstateAgent",
+    "real estate agent": "RealEstateAgent",
+    "auto repair": "AutoRepair",
+    "mechanic": "AutoRepair",
+    "auto body": "AutoBodyShop",
+    "tire shop": "TireShop",
+    "towing": "AutomotiveBusiness",
+    "car wash": "AutoWash",
+    "hair salon": "HairSalon",
+    "barber": "HairSalon",
+    "nail salon": "NailSalon",
+    "beauty salon": "BeautySalon",
+    "day spa": "DaySpa",
+    "gym": "HealthClub",
+    "personal trainer": "HealthClub",
+    "daycare": "ChildCare",
+    "child care": "ChildCare",
+    "dry cleaner": "DryCleaningOrLaundry",
+    "laundry": "DryCleaningOrLaundry",
+    "florist": "Florist",
+    "bakery": "Bakery",
+    "restaurant": "Restaurant",
+    "cafe": "CafeOrCoffeeShop",
+    "coffee shop": "CafeOrCoffeeShop",
+    "pet store": "PetStore",
+    "travel agent": "TravelAgency",
+}
+
+# The types a schema may use: the table's, plus the generic fallbacks.
+DEFAULT_SCHEMA_TYPE = "ProfessionalService"
+ALLOWED_SCHEMA_TYPES = frozenset(NICHE_SCHEMA_TYPES.values()) | {
+    "LocalBusiness", DEFAULT_SCHEMA_TYPE, "HomeAndConstructionBusiness", "AutomotiveBusiness",
+    "MedicalBusiness", "LegalService", "FinancialService", "FoodEstablishment", "Store",
+    "HealthAndBeautyBusiness", "EmergencyService", "EntertainmentBusiness", "LodgingBusiness",
+    "SportsActivityLocation"
+}
+
+# Niches missing from the table can ask Gemini to pick the type. Set to "false" to use
+# DEFAULT_SCHEMA_TYPE for them instead.
+SCHEMA_LLM_FALLBACK_ENABLED = os.getenv("SCHEMA_LLM_FALLBACK_ENABLED", "true").lower() == "true"
+
+
+def _normalize_words(text: str) -> List[str]:
+    """Lowercases and singularizes the words of a niche ("Roofers" -> ["roofer"])."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words]
+
+
+@lru_cache(maxsize=1024)
+def schema_type_for_niche(niche: str) -> Optional[str]:
+    """Returns the schema.org type of a niche from NICHE_SCHEMA_TYPES, or None if it's not covered."""
+    words = _normalize_words(niche)
+    # Try every phrase of the niche, longest first.
+    for length in range(min(len(words), 3), 0, -1):
+        for start in range(len(words) - length + 1):
+            schema_type = NICHE_SCHEMA_TYPES.get(" ".join(words[start:start + length]))
+            if schema_type:
+                return schema_type
+    return None
+
+
+def parse_location(location: str) -> dict:
+    """Splits "City, ST" into a PostalAddress's addressLocality and addressRegion."""
+    city, _, region = (part.strip() for part in location.partition(","))
+    address = {"@type": "PostalAddress", "addressLocality": city}
+    if region:
+        address["addressRegion"] = region
+    return address
+
+
+def build_local_business_schema(
+    business_name: str,
+    schema_type: str,
+    location: str,
+    phone_number: str,
+    website_url: str
+) -> dict:
+    """Builds the LocalBusiness JSON-LD object."""
+    return {
+        "@context": "https://schema.org",
+        "@type": schema_type,
+        "name": business_name,
+        "address": parse_location(location),
+        "telephone": phone_number,
+        "url": website_url
+    }
+
+
+def validate_local_business_schema(schema: dict) -> List[str]:
+    """Returns the problems with a LocalBusiness JSON-LD object; an empty list means it's valid."""
+    problems = []
+    if schema.get("@context") != "https://schema.org":
+        problems.append('"@context" must be "https://schema.org".')
+    if schema.get("@type") not in ALLOWED_SCHEMA_TYPES:
+        problems.append(f'"@type" {schema.get("@type")!r} is not a known LocalBusiness type.')
+    for field in ("name", "telephone", "url"):
+        if not isinstance(schema.get(field), str) or not schema[field].strip():
+            problems.append(f'"{field}" must be a non-empty string.')
+    address = schema.get("address")
+    if not isinstance(address, dict) or address.get("@type") != "PostalAddress":
+        problems.append('"address" must be a PostalAddress.')
+    elif not address.get("addressLocality"):
+        problems.append('"address" needs an "addressLocality".')
+    return problems
+
+
+def render_schema_script(schema: dict) -> str:
+    """Serializes a schema as a <script type="application/ld+json"> tag."""
+    # "</" is escaped so a value can never close the script tag early.
+    payload = json.dumps(schema, indent=2, ensure_ascii=False).replace("</", "<\\/")
+    return f'<script type="application/ld+json">\n{payload}\n</script>'
+
+
+def _ask_llm_for_schema_type(niche: str, regenerate: bool) -> str:
+    """Asks Gemini for the schema.org type of a niche the table doesn't cover."""
+    prompt = f"""
+    You are a technical SEO expert specializing in structured data. Pick the most specific schema.org
+    `LocalBusiness` subtype for a business in the niche '{niche}'.
+
+    Choose ONLY from this list: {", ".join(sorted(ALLOWED_SCHEMA_TYPES))}.
+    If none of the specific types fit, use "{DEFAULT_SCHEMA_TYPE}".
+    Return a JSON object with the single key "type".
+    """
+    # The answer is cached per niche; anything outside the allowed list is not used.
+    schema_type = cached_generate_content(
+        prompt,
+        regenerate=regenerate,
+        parse=lambda text: json.loads(text.strip().replace('```json', '').replace('```', ''))["type"],
+        generation_config={"response_mime_type": "application/json"}
+    )
+    return schema_type if schema_type in ALLOWED_SCHEMA_TYPES else DEFAULT_SCHEMA_TYPE
+
+
 def generate_schema_tool(
-    business_name: str, 
-    niche: str, 
+    business_name: str,
+    niche: str,
     location: str,
     phone_number: str = "555-555-5555", # Placeholder
-    website_url: str = "#" # Placeholder
+    website_url: str = "#", # Placeholder
+    regenerate: bool = False
 ) -> str:
     """
     Generates LocalBusiness JSON-LD schema markup.
 
+    The markup is built locally: the `@type` comes from NICHE_SCHEMA_TYPES, and the result is
+    validated before it is returned. Only niches the table doesn't cover ask Gemini for the
+    type (a small, cached call); the rest of the markup never depends on the model.
+
     Args:
         business_name: The name of the business.
         niche: The business niche (e.g., "Roofer", "Landscaper").
         location: The geographic city and state (e.g., "Boise, ID").
         phone_number: The business phone number.
         website_url: The business's website URL.
+        regenerate: Ask Gemini again for the type of an unknown niche instead of using the cached answer.
 
     Returns:
         A string containing the JSON-LD schema inside a <script> tag.
     """
     print(f"--- Generating LocalBusiness schema for '{business_name}' ---")
 
-    # Construct a detailed prompt for the LLM
-    prompt = f"""
-    You are a technical SEO expert specializing in structured data. Your task is to generate `LocalBusiness` JSON-LD schema markup.
-
-    **Business Details:**
-    - Business Name: {business_name}
-    - Business Type/Niche: {niche}
-    - Location (City, State): {location}
-    - Phone Number: {phone_number}
-    - Website URL: {website_url}
-
-    **Instructions:**
-    1.  Create a valid JSON-LD object for a `LocalBusiness`.
-    2.  Use the `@type` appropriate for the niche (e.g., "RoofingContractor", "Plumber", "Landscaper"). If unsure, use a general type like "ProfessionalService".
-    3.  The `address` field should be an `PostalAddress` object with `addressLocality` and `addressRegion` based on the provided location.
-    4.  Include the `name`, `telephone`, and `url` fields.
-    5.  The final output should be ONLY the complete `<script type="application/ld+json">` tag containing the JSON-LD. Do not add any other text or explanation.
-    """
+    schema_type = schema_type_for_niche(niche)
+    if schema_type is None:
+        schema_type = DEFAULT_SCHEMA_TYPE
+        if SCHEMA_LLM_FALLBACK_ENABLED:
+            try:
+                schema_type = _ask_llm_for_schema_type(niche, regenerate)
+            except Exception as e:
+                print(f"  > Could not classify niche '{niche}' with Gemini ({e}); using {DEFAULT_SCHEMA_TYPE}.")
 
-    try:
-        # Adhering to the rule of using the most cost-effective model
-        model = genai.GenerativeModel('gemini-2.0-flash-lite-001')
-        response = model.generate_content(prompt)
-        
-        # Clean the response to ensure it's just the script tag
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-        return cleaned_response
-        
-    except Exception as e:
-        print(f"An error occurred during schema generation: {e}")
-        return f"<!-- Schema generation failed: {e} -->"
+    schema = build_local_business_schema(business_name, schema_type, location, phone_number, website_url)
+    problems = validate_local_business_schema(schema)
+    if problems:
+        print(f"An error occurred during schema generation: {' '.join(problems)}")
+        return f"<!-- Schema generation failed: {' '.join(problems)} -->"
+    return render_schema_script(schema)
 
 # This allows us to test the tool directly
 if __name__ == '__main__':
     print("--- Testing generate_schema_tool ---")
-    
+
     test_business_name = "Apex Roofing"
     test_niche = "Roofer"
     test_location = "Boise, ID"
-    
+
     generated_schema = generate_schema_tool(
         business_name=test_business_name,
         niche=test_niche,
@@ -0,0 +1,79 @@
+# File: app/agents/tools/site_artifact.py
+# Author: MCP Development Core
+# Description: An in-memory build of a static site, hashed once and shared by every later step.
+
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+
+class ArtifactFile:
+    """One built file: its bytes, with the SHA1 and MIME type computed when it was added."""
+
+    __slots__ = ("path", "content", "sha1", "content_type")
+
+    def __init__(self, path: str, content: bytes):
+        self.path = path
+        self.content = content
+        self.sha1 = hashlib.sha1(content).hexdigest()
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class SiteArtifact:
+    """
+    A static site built in memory, keyed by site path ("/index.html").
+
+    Each file is encoded and hashed once, when it is added. The deploy manifest, the
+    uploads and the optional export to disk all read those same buffers.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, ArtifactFile] = {}
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        path = "/" + path.replace("\\", "/").lstrip("/")
+        # Paths end up in URLs and, on export, on disk; they must stay inside the site.
+        if ".." in path.split("/"):
+            raise ValueError(f"Invalid site path: {path}")
+        return path
+
+    def add(self, path: str, content: Union[str, bytes]) -> ArtifactFile:
+        """Adds (or replaces) a file. Text is stored as UTF-8."""
+        path = self._normalize(path)
+        data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+        self._files[path] = ArtifactFile(path, data)
+        return self._files[path]
+
+    def __contains__(self, path: str) -> bool:
+        return self._normalize(path) in self._files
+
+    def __iter__(self) -> Iterator[ArtifactFile]:
+        return iter(self._files.values())
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def read(self, path: str) -> bytes:
+        return self._files[self._normalize(path)].content
+
+    def content_type(self, path: str) -> str:
+        return self._files[self._normalize(path)].content_type
+
+    def manifest(self) -> Dict[str, str]:
+        """The deploy manifest: {"/path": sha1}."""
+        return {path: file.sha1 for path, file in self._files.items()}
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(file.content) for file in self._files.values())
+
+    def export(self, directory: Union[str, Path]) -> Path:
+        """Writes every file under `directory` (e.g. to inspect a build) and returns it."""
+        root = Path(directory)
+        for path, file in self._files.items():
+            target = root / path.lstrip("/")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(file.content)
+        return root
@@ -0,0 +1,83 @@
+# File: app/agents/tools/site_templates.py
+# Author: MCP Development Core
+# Description: Compiled Jinja2 templates for generated sites, with the shared page shell rendered once per site.
+
+import re
+import uuid
+import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup, escape
+
+# Site templates live next to the app's own templates, under app/templates/site.
+SITE_TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "templates"
+DEFAULT_PAGE_TEMPLATE = "site/page.html"
+
+# Templates are compiled on first use and kept for the life of the process; they are
+# never re-checked on disk.
+_environment = Environment(
+    loader=FileSystemLoader(str(SITE_TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False
+)
+
+
+def get_page_template(template_name: str = DEFAULT_PAGE_TEMPLATE):
+    """Returns a compiled site template, compiling it on first use."""
+    return _environment.get_template(template_name)
+
+
+# The per-page parts of the shell. Everything else is the same on every page of a site.
+PAGE_SLOTS = ("title", "head_extra", "content")
+
+
+def build_nav(site_structure: Dict[str, Dict[str, str]]) -> List[Dict[str, str]]:
+    """The nav links of a site, in site order. Pages with "nav": False are left out."""
+    return [
+        {"href": filename, "title": page_info.get("title", filename)}
+        for filename, page_info in site_structure.items()
+        if page_info.get("nav", True)
+    ]
+
+
+class SiteShell:
+    """
+    The page template of one site, rendered once with its business name and nav.
+
+    The per-page slots (PAGE_SLOTS) are left as markers and the shell is split around
+    them, so rendering a page is a single join of precomputed strings: its cost doesn't
+    grow with the size of the nav or the number of pages in the site.
+    """
+
+    def __init__(
+        self,
+        business_name: str,
+        site_structure: Dict[str, Dict[str, str]],
+        template_name: str = DEFAULT_PAGE_TEMPLATE
+    ):
+        token = uuid.uuid4().hex
+        markers = {slot: Markup(f"<!--slot:{slot}:{token}-->") for slot in PAGE_SLOTS}
+        shell = get_page_template(template_name).render(
+            business_name=business_name,
+            nav=build_nav(site_structure),
+            year=datetime.date.today().year,
+            **markers
+        )
+        # re.split with a capture group alternates literal text and slot names.
+        parts = re.split(f"<!--slot:({'|'.join(PAGE_SLOTS)}):{token}-->", shell)
+        self._literals = parts[0::2]
+        self._slots = parts[1::2]
+
+    def render(self, title: str, content: str, head_extra: str = "") -> str:
+        """
+        Renders one page. `title` is escaped; `content` and `head_extra` are trusted HTML
+        (the edited page body and e.g. a JSON-LD script tag).
+        """
+        values = {"title": str(escape(title)), "head_extra": head_extra, "content": content}
+        pieces = [self._literals[0]]
+        for slot, literal in zip(self._slots, self._literals[1:]):
+            pieces.append(values[slot])
+            pieces.append(literal)
+        return "".join(pieces)
@@ -2,21 +2,43 @@
 # Author: MCP Development Core
 # Description: Main entry point for the Local Arbitrage MCP Server.
 
+import json
 import uuid
-from typing import Dict, Any
-from fastapi import FastAPI, Depends, BackgroundTasks, HTTPException, status, Request
-from fastapi.responses import HTMLResponse
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from firebase_admin import firestore
 
 # Import our security function
-from app.security.authentication import get_current_user
+from app.security.authentication import (
+    get_current_user,
+    start_certificate_refresher,
+    stop_certificate_refresher,
+    token_cache
+)
 
 # Import our agent functions
-from app.agents.market_opportunity_finder import analyze_market_opportunity
-from app.agents.digital_asset_generator import generate_content_for_editing, assemble_and_push_to_cms
+from app.agents.market_opportunity_finder import analysis_flights, analyze_market_opportunity
+from app.agents.bulk_market_scanner import BULK_MAX_MARKETS, build_market_grid, scan_markets
+from app.agents.digital_asset_generator import (
+    generate_content_for_editing,
+    generation_flights,
+    stream_content_for_editing,
+    assemble_and_push_to_cms
+)
+
+# Import our data access layer
+from app.repositories.firestore_repository import repository, DEFAULT_SITES_PAGE_SIZE, MAX_SITES_PAGE_SIZE
+
+# Import the background task queue
+from app.task_queue import TaskWorkerPool, SQLiteTaskStore
+
+# Import the metrics registry and the caches it reports on
+from app.metrics import instrumented_pipeline, register_stats, render_metrics, track_stage
+from app.agents.tools.response_cache import all_cache_stats
 
 # --- App Configuration ---
 app = FastAPI(
@@ -27,17 +49,25 @@ app = FastAPI(
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
-db = firestore.client()
 
 # --- Pydantic Models for Data Validation ---
 class AnalysisRequest(BaseModel):
     niche: str
     location: str
+    regenerate: bool = False # Bypass the LLM response cache
+    force_llm: bool = False # Score with Gemini even when the heuristic score is clear-cut
+
+class BatchAnalysisRequest(BaseModel):
+    niches: List[str]
+    locations: List[str] # Every niche is analyzed in every location
+    regenerate: bool = False # Bypass the LLM response cache
+    force_llm: bool = False # Score with Gemini even when the heuristic score is clear-cut
 
 class ContentGenerationRequest(BaseModel):
     business_name: str
     niche: str
     location: str
+    regenerate: bool = False # Bypass the LLM response cache
 
 class AssemblyRequest(BaseModel):
     business_name: str
@@ -45,131 +75,271 @@ class AssemblyRequest(BaseModel):
     location: str
     edited_content: Dict[str, str]
     site_structure: Dict[str, Dict[str, str]]
+    site_id: Optional[str] = None # Set when re-deploying an existing site; only changed pages are pushed
 
 class UserSettings(BaseModel):
     netlify_api_key: str # This can be expanded later to include Sanity keys if needed
 
-# --- In-memory storage for background task status ---
-cms_push_tasks = {}
+# --- Streaming Helpers ---
+async def format_sse(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Serializes agent events ({"event": ..., "data": ...}) as Server-Sent Events."""
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
 
-def run_cms_push_task(task_id: str, user_id: str, request_data: dict):
-    """A wrapper function that runs the agent to push content to the CMS."""
-    try:
-        result = assemble_and_push_to_cms(
-            business_name=request_data['business_name'],
-            niche=request_data['niche'],
-            location=request_data['location'],
-            edited_content=request_data['edited_content'],
-            site_structure=request_data['site_structure']
-        )
-        
-        # --- THIS IS THE FIX ---
-        # If the push to Sanity was successful, save a record to Firestore.
-        if result.get("success"):
-            sanity_results = result.get("sanity_result", {}).get("result", {}).get("results", [])
-            if sanity_results:
-                # Use the first document ID from the Sanity result as our site ID
-                site_id = sanity_results[0].get("document", {}).get("_id")
-                if site_id:
-                    site_doc_ref = db.collection('users').document(user_id).collection('sites').document(site_id)
-                    site_doc_ref.set({
-                        "business_name": request_data['business_name'],
-                        "niche": request_data['niche'],
-                        "location": request_data['location'],
-                        "sanity_site_id": site_id, # Store the Sanity ID
-                        "content": request_data['edited_content'],
-                        "site_structure": request_data['site_structure'],
-                        "last_updated": firestore.SERVER_TIMESTAMP
-                    }, merge=True)
-
-        cms_push_tasks[task_id] = {"status": "complete", "result": result}
-    except Exception as e:
-        cms_push_tasks[task_id] = {"status": "failed", "error": str(e)}
+# How often a status stream checks the task store, and how often it sends a keep-alive.
+TASK_EVENT_POLL_SECONDS = 0.25
+TASK_EVENT_HEARTBEAT_SECONDS = 15.0
+
+async def stream_task_events(task_id: str, request: Request) -> AsyncIterator[str]:
+    """
+    Streams a task's progress events, then its final status, as Server-Sent Events.
+
+    The caller is authenticated once when the stream opens. After that, new events are
+    read from the local task store, so waiting costs no further token verification.
+    """
+    last_event_id = 0
+    last_sent = asyncio.get_running_loop().time()
+    while not await request.is_disconnected():
+        events = await asyncio.to_thread(task_queue.get_events, task_id, last_event_id)
+        for event in events:
+            last_event_id = event["id"]
+            yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+        task = await asyncio.to_thread(task_queue.get_status, task_id)
+        if task is None or task["status"] in ("complete", "failed"):
+            # The worker may have written its last events between the two reads above.
+            for event in await asyncio.to_thread(task_queue.get_events, task_id, last_event_id):
+                last_event_id = event["id"]
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            task = task or {"status": "failed", "error": "Task not found"}
+            task.pop("owner_id", None)
+            yield f"event: status\ndata: {json.dumps(task, default=str)}\n\n"
+            return
+
+        now = asyncio.get_running_loop().time()
+        if events:
+            last_sent = now
+        elif now - last_sent >= TASK_EVENT_HEARTBEAT_SECONDS:
+            last_sent = now
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(TASK_EVENT_POLL_SECONDS)
+
+# --- Background Task Queue ---
+# Tasks live in a shared store, so any worker process can run them and answer status polls.
+task_queue = TaskWorkerPool(SQLiteTaskStore())
+
+@instrumented_pipeline("cms_push_task")
+async def run_cms_push_task(task_id: str, payload: dict) -> dict:
+    """Runs the agent to push content to the CMS. Raising makes the queue retry the task."""
+    user_id = payload['user_id']
+    site_id = payload['site_id']
+    request_data = payload['request_data']
+
+    # The hashes from the last successful push tell the agent which pages are unchanged. A
+    # site with a record but no hashes was pushed before page IDs were deterministic; its
+    # old page documents are replaced rather than left next to the new ones.
+    existing_site = await repository.get_site(user_id, site_id)
+    previous_hashes = (existing_site or {}).get("page_hashes", {})
+    replace_legacy_pages = existing_site is not None and "page_hashes" not in existing_site
+
+    # The Sanity push is blocking I/O, so it runs in a worker thread.
+    result = await asyncio.to_thread(
+        assemble_and_push_to_cms,
+        business_name=request_data['business_name'],
+        niche=request_data['niche'],
+        location=request_data['location'],
+        edited_content=request_data['edited_content'],
+        site_structure=request_data['site_structure'],
+        user_id=user_id,
+        site_id=site_id,
+        previous_hashes=previous_hashes,
+        on_progress=lambda stage, detail=None: task_queue.report_progress(task_id, stage, detail),
+        replace_legacy_pages=replace_legacy_pages
+    )
+    if not result.get("success"):
+        raise RuntimeError(result.get("error", "The CMS push failed."))
+
+    # The page hashes are saved only after Sanity has accepted every change, so a failed
+    # push is retried in full next time.
+    with track_stage("cms_push_task", "firestore_write"):
+        await repository.save_site(user_id, site_id, {
+            "business_name": request_data['business_name'],
+            "niche": request_data['niche'],
+            "location": request_data['location'],
+            "sanity_site_id": site_id, # The site ID the Sanity page IDs are derived from
+            "content": request_data['edited_content'],
+            "site_structure": request_data['site_structure'],
+            "page_hashes": result["page_hashes"]
+        })
+    await asyncio.to_thread(task_queue.report_progress, task_id, "Firestore saved", {"site_id": site_id})
+
+    return result
+
+task_queue.register("cms_push", run_cms_push_task)
+
+# --- Metrics ---
+# Cache and token-cache counters are read on every scrape, alongside the span timings.
+for cache_namespace in all_cache_stats():
+    register_stats(f"{cache_namespace}_cache", lambda namespace=cache_namespace: all_cache_stats()[namespace])
+register_stats("token_cache", token_cache.stats)
+register_stats("analyze_single_flight", analysis_flights.stats)
+register_stats("generate_single_flight", generation_flights.stats)
+
+@app.on_event("startup")
+async def start_task_workers():
+    await task_queue.start()
+
+@app.on_event("startup")
+async def start_background_refreshes():
+    start_certificate_refresher()
+
+@app.on_event("shutdown")
+async def stop_task_workers():
+    await task_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_background_refreshes():
+    stop_certificate_refresher()
 
 
 # --- HTML Serving Endpoint ---
 @app.get("/", response_class=HTMLResponse)
-def read_root(request: Request):
+async def read_root(request: Request):
     """Serves the main index.html file as the root page."""
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Exposes latency histograms, in-flight gauges and error counters in Prometheus format."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # --- Protected API Endpoints (v1) ---
+# The agents are async end to end, so these routes run on the event loop and a single
+# worker can hold many requests that are waiting on Gemini, searches or scrapes.
 @app.post("/api/v1/generate-content")
-def generate_initial_content(request: ContentGenerationRequest, user: dict = Depends(get_current_user)):
+async def generate_initial_content(request: ContentGenerationRequest, user: dict = Depends(get_current_user)):
     """Generates the initial AI content for all pages and returns it for editing."""
-    return generate_content_for_editing(
+    return await generate_content_for_editing(
         business_name=request.business_name,
         niche=request.niche,
-        location=request.location
+        location=request.location,
+        regenerate=request.regenerate
+    )
+
+@app.post("/api/v1/generate-content/stream")
+async def stream_initial_content(request: ContentGenerationRequest, user: dict = Depends(get_current_user)):
+    """Streams the initial AI content page by page as Server-Sent Events."""
+    events = stream_content_for_editing(
+        business_name=request.business_name,
+        niche=request.niche,
+        location=request.location,
+        regenerate=request.regenerate
+    )
+    return StreamingResponse(
+        format_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.post("/api/v1/assemble-and-deploy", status_code=status.HTTP_202_ACCEPTED)
-def start_assembly_and_push(
-    request: AssemblyRequest,
-    background_tasks: BackgroundTasks,
-    user: dict = Depends(get_current_user)
-):
+async def start_assembly_and_push(request: AssemblyRequest, user: dict = Depends(get_current_user)):
     """
-    Starts a background task to assemble content and push it to the Headless CMS.
+    Queues a background task to assemble content and push it to the Headless CMS.
     """
     user_id = user["uid"]
-    task_id = str(uuid.uuid4())
-    cms_push_tasks[task_id] = {"status": "in_progress"}
-    
-    background_tasks.add_task(run_cms_push_task, task_id, user_id, request.dict())
+    # A new site gets its ID now, so a retried task updates the same Sanity documents.
+    site_id = request.site_id or uuid.uuid4().hex
+    task_id = await asyncio.to_thread(
+        task_queue.enqueue,
+        "cms_push",
+        {"user_id": user_id, "site_id": site_id, "request_data": request.dict(exclude={"site_id"})},
+        owner_id=user_id
+    )
     
-    return {"message": "Content push to CMS started.", "task_id": task_id}
+    return {"message": "Content push to CMS started.", "task_id": task_id, "site_id": site_id}
 
 @app.get("/api/v1/deployment-status/{task_id}")
-def get_push_status(task_id: str, user: dict = Depends(get_current_user)):
+async def get_push_status(task_id: str, user: dict = Depends(get_current_user)):
     """Polls for the status of a background CMS push task."""
-    task = cms_push_tasks.get(task_id)
-    if not task:
+    task = await asyncio.to_thread(task_queue.get_status, task_id)
+    if not task or task.pop("owner_id") != user["uid"]:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
+@app.get("/api/v1/deployment-status/{task_id}/events")
+async def subscribe_to_push_status(task_id: str, request: Request, user: dict = Depends(get_current_user)):
+    """Pushes per-stage progress and the final status of a CMS push task as Server-Sent Events."""
+    task = await asyncio.to_thread(task_queue.get_status, task_id)
+    if not task or task["owner_id"] != user["uid"]:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(
+        stream_task_events(task_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- Other Endpoints (Largely Unchanged) ---
 @app.get("/api/v1/sites")
-def get_user_sites(user: dict = Depends(get_current_user)):
-    """Retrieves a list of all sites for the current user."""
-    user_id = user["uid"]
-    sites_ref = db.collection('users').document(user_id).collection('sites')
-    sites = []
-    for doc in sites_ref.stream():
-        site_data = doc.to_dict()
-        # We don't need to send the full content in the list view
-        site_data.pop('content', None) 
-        site_data.pop('site_structure', None)
-        sites.append(site_data)
-    return sites
+async def get_user_sites(
+    page_size: int = Query(DEFAULT_SITES_PAGE_SIZE, ge=1, le=MAX_SITES_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    """Retrieves one page of site summaries for the current user, newest first."""
+    try:
+        return await repository.list_sites(user["uid"], page_size=page_size, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/v1/sites/{site_id}")
-def get_site_details(site_id: str, user: dict = Depends(get_current_user)):
+async def get_site_details(site_id: str, user: dict = Depends(get_current_user)):
     """Retrieves the full details, including content, for a specific site."""
-    user_id = user["uid"]
-    doc_ref = db.collection('users').document(user_id).collection('sites').document(site_id)
-    doc = doc_ref.get()
-    if not doc.exists:
+    site = await repository.get_site(user["uid"], site_id)
+    if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
-    return doc.to_dict()
+    return site
 
 @app.get("/api/v1/me")
-def get_user_profile(user: dict = Depends(get_current_user)):
+async def get_user_profile(user: dict = Depends(get_current_user)):
     return {"message": "Authenticated successfully!", "user_data": user}
 
 @app.post("/api/v1/user/settings")
-def save_user_settings(settings: UserSettings, user: dict = Depends(get_current_user)):
-    user_id = user["uid"]
-    db.collection('users').document(user_id).set({'netlify_api_key': settings.netlify_api_key}, merge=True)
+async def save_user_settings(settings: UserSettings, user: dict = Depends(get_current_user)):
+    await repository.save_user_settings(user["uid"], {'netlify_api_key': settings.netlify_api_key})
     return {"message": "Settings saved successfully."}
 
 @app.get("/api/v1/user/settings")
-def get_user_settings(user: dict = Depends(get_current_user)):
-    user_id = user["uid"]
-    doc = db.collection('users').document(user_id).get()
-    return doc.to_dict() if doc.exists else {}
+async def get_user_settings(user: dict = Depends(get_current_user)):
+    return await repository.get_user_settings(user["uid"])
 
 @app.post("/api/v1/analyze")
-def run_market_analysis(request: AnalysisRequest, user: dict = Depends(get_current_user)):
-    return analyze_market_opportunity(niche=request.niche, location=request.location)
+async def run_market_analysis(request: AnalysisRequest, user: dict = Depends(get_current_user)):
+    return await analyze_market_opportunity(
+        niche=request.niche,
+        location=request.location,
+        regenerate=request.regenerate,
+        force_llm=request.force_llm
+    )
+
+@app.post("/api/v1/analyze/batch")
+async def run_bulk_market_analysis(request: BatchAnalysisRequest, user: dict = Depends(get_current_user)):
+    """Analyzes every niche in every location, streaming each market's result as Server-Sent Events."""
+    markets = len(build_market_grid(request.niches, request.locations))
+    if markets == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one niche and one location.")
+    if markets > BULK_MAX_MARKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A scan covers at most {BULK_MAX_MARKETS} markets; this one has {markets}."
+        )
+    events = scan_markets(
+        request.niches, request.locations, regenerate=request.regenerate, force_llm=request.force_llm
+    )
+    return StreamingResponse(
+        format_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,151 @@
+# File: app/metrics.py
+# Author: MCP Development Core
+# Description: Span timing for the pipelines and their external dependencies, exported in Prometheus format.
+
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Sized for calls that range from a cached lookup to a slow LLM response.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PIPELINE_SECONDS = Histogram(
+    "mcp_pipeline_duration_seconds", "End-to-end duration of a pipeline run.",
+    ["pipeline"], buckets=LATENCY_BUCKETS
+)
+PIPELINE_IN_FLIGHT = Gauge("mcp_pipeline_in_flight", "Pipeline runs currently in progress.", ["pipeline"])
+PIPELINE_ERRORS = Counter("mcp_pipeline_errors_total", "Pipeline runs that failed.", ["pipeline"])
+
+STAGE_SECONDS = Histogram(
+    "mcp_stage_duration_seconds", "Duration of one stage of a pipeline.",
+    ["pipeline", "stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("mcp_stage_errors_total", "Pipeline stages that failed.", ["pipeline", "stage"])
+
+DEPENDENCY_SECONDS = Histogram(
+    "mcp_dependency_request_duration_seconds", "Duration of a call to an external dependency.",
+    ["dependency", "operation"], buckets=LATENCY_BUCKETS
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    "mcp_dependency_requests_in_flight", "Calls to an external dependency currently in progress.", ["dependency"]
+)
+DEPENDENCY_ERRORS = Counter(
+    "mcp_dependency_errors_total", "Calls to an external dependency that failed.", ["dependency", "operation"]
+)
+
+
+class Span:
+    """A timed unit of work. Call fail() to count it as an error without raising."""
+
+    def __init__(self):
+        self.failed = False
+        self.seconds = 0.0
+
+    def fail(self):
+        self.failed = True
+
+
+@contextmanager
+def _timed(histogram, errors, in_flight=None) -> Iterator[Span]:
+    span = Span()
+    if in_flight is not None:
+        in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield span
+    # BaseException, so a call cancelled by a deadline is counted as a failure too.
+    except BaseException:
+        span.failed = True
+        raise
+    finally:
+        span.seconds = time.perf_counter() - start
+        histogram.observe(span.seconds)
+        if span.failed:
+            errors.inc()
+        if in_flight is not None:
+            in_flight.dec()
+
+
+def track_stage(pipeline: str, stage: str):
+    """Times one stage of a pipeline, e.g. `with track_stage("analyze", "search") as span:`."""
+    return _timed(STAGE_SECONDS.labels(pipeline, stage), STAGE_ERRORS.labels(pipeline, stage))
+
+
+def track_dependency(dependency: str, operation: str):
+    """Times one call to an external service and tracks how many are in flight."""
+    return _timed(
+        DEPENDENCY_SECONDS.labels(dependency, operation),
+        DEPENDENCY_ERRORS.labels(dependency, operation),
+        DEPENDENCY_IN_FLIGHT.labels(dependency)
+    )
+
+
+def _result_failed(result) -> bool:
+    """The agents report failure in their result dict rather than by raising."""
+    return isinstance(result, dict) and ("error" in result or result.get("success") is False)
+
+
+def instrumented_pipeline(pipeline: str):
+    """
+    Decorates a pipeline function (sync or async) to record its duration, runs in flight
+    and failures. A returned dict with an "error" key or "success": False counts as a failure.
+    """
+    def decorator(func: Callable):
+        labels = (PIPELINE_SECONDS.labels(pipeline), PIPELINE_ERRORS.labels(pipeline), PIPELINE_IN_FLIGHT.labels(pipeline))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _timed(*labels) as span:
+                    result = await func(*args, **kwargs)
+                    if _result_failed(result):
+                        span.fail()
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed(*labels) as span:
+                result = func(*args, **kwargs)
+                if _result_failed(result):
+                    span.fail()
+                return result
+        return wrapper
+    return decorator
+
+
+class _StatsCollector:
+    """Exports the stats() dictionaries of in-process components (caches etc.) as gauges."""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], dict]] = {}
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "mcp_component_stat", "Counters and sizes reported by in-process components.",
+            labels=["component", "stat"]
+        )
+        for component, stats in list(self.sources.items()):
+            for stat, value in stats().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    family.add_metric([component, stat], value)
+        yield family
+
+
+_stats_collector = _StatsCollector()
+REGISTRY.register(_stats_collector)
+
+
+def register_stats(component: str, stats: Callable[[], dict]):
+    """Adds a component whose stats() numbers are exported on every scrape."""
+    _stats_collector.sources[component] = stats
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Returns the current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
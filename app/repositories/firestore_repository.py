@@ -0,0 +1,138 @@
+# File: app/repositories/firestore_repository.py
+# Author: MCP Development Core
+# Description: Async Firestore access for user settings and site records.
+
+import json
+import base64
+import asyncio
+from datetime import datetime
+from typing import Optional
+import firebase_admin
+from firebase_admin import firestore
+
+from app.metrics import track_dependency
+
+# The fields the site list needs. Projecting to these keeps the large `content` and
+# `site_structure` blobs from ever leaving Firestore during a listing.
+SITE_SUMMARY_FIELDS = ["business_name", "niche", "location", "sanity_site_id", "last_updated"]
+DEFAULT_SITES_PAGE_SIZE = 20
+MAX_SITES_PAGE_SIZE = 100
+
+
+def encode_sites_cursor(last_updated: datetime, site_id: str) -> str:
+    """Encodes the position after a site in the `last_updated` ordering as an opaque cursor."""
+    position = json.dumps({"last_updated": last_updated.isoformat(), "site_id": site_id})
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+
+def decode_sites_cursor(cursor: str) -> dict:
+    """Decodes a cursor from `encode_sites_cursor`. Raises ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"last_updated": datetime.fromisoformat(position["last_updated"]), "__name__": position["site_id"]}
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class FirestoreRepository:
+    """
+    Reads and writes the `users/{uid}` documents and their `sites` sub-collections
+    with the async Firestore client, so database I/O never blocks the event loop.
+
+    The client is created on first use, inside the running event loop, from the
+    credentials of the Firebase app initialized by the authentication module. Setting the
+    FIRESTORE_EMULATOR_HOST environment variable points it at the Firestore emulator,
+    which is how the repository is exercised in tests.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self):
+        # gRPC channels are bound to the event loop they were opened on, so unlike
+        # firebase_admin.firestore_async.client() we keep one client per loop.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            app = firebase_admin.get_app()
+            self._client = firestore.AsyncClient(
+                credentials=app.credential.get_credential(),
+                project=app.project_id
+            )
+            self._loop = loop
+        return self._client
+
+    def _user_ref(self, user_id: str):
+        return self.client.collection('users').document(user_id)
+
+    def _sites_ref(self, user_id: str):
+        return self._user_ref(user_id).collection('sites')
+
+    # --- User settings ---
+
+    async def get_user_settings(self, user_id: str) -> dict:
+        with track_dependency("firestore", "get_user_settings"):
+            doc = await self._user_ref(user_id).get()
+        return doc.to_dict() if doc.exists else {}
+
+    async def save_user_settings(self, user_id: str, settings: dict):
+        with track_dependency("firestore", "save_user_settings"):
+            await self._user_ref(user_id).set(settings, merge=True)
+
+    # --- Site records ---
+
+    async def list_sites(
+        self,
+        user_id: str,
+        page_size: int = DEFAULT_SITES_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        Returns one page of a user's site summaries, most recently updated first.
+
+        Only SITE_SUMMARY_FIELDS are read, so the cost of a page doesn't depend on how
+        large the sites' content is. Pass the returned `next_cursor` back to get the
+        following page; it is None on the last page.
+        """
+        page_size = max(1, min(page_size, MAX_SITES_PAGE_SIZE))
+        query = (
+            self._sites_ref(user_id)
+            .select(SITE_SUMMARY_FIELDS)
+            .order_by("last_updated", direction=firestore.Query.DESCENDING)
+            .order_by("__name__", direction=firestore.Query.DESCENDING)
+        )
+        if cursor:
+            query = query.start_after(decode_sites_cursor(cursor))
+        # Ask for one extra document to learn whether another page exists.
+        query = query.limit(page_size + 1)
+
+        with track_dependency("firestore", "list_sites"):
+            docs = [doc async for doc in query.stream()]
+        sites = [{"site_id": doc.id, **doc.to_dict()} for doc in docs[:page_size]]
+
+        next_cursor = None
+        if len(docs) > page_size:
+            last_site = sites[-1]
+            next_cursor = encode_sites_cursor(last_site["last_updated"], last_site["site_id"])
+        return {"sites": sites, "next_cursor": next_cursor}
+
+    async def get_site(self, user_id: str, site_id: str) -> Optional[dict]:
+        with track_dependency("firestore", "get_site"):
+            doc = await self._sites_ref(user_id).document(site_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def save_site(self, user_id: str, site_id: str, record: dict):
+        """
+        Writes the top-level fields of `record` into a site document and stamps `last_updated`.
+
+        Each field is replaced as a whole (a page removed from `content` or `page_hashes`
+        does not linger); fields not in `record` are left as they are.
+        """
+        with track_dependency("firestore", "save_site"):
+            await self._sites_ref(user_id).document(site_id).set(
+                {**record, "last_updated": firestore.SERVER_TIMESTAMP}, merge=[*record, "last_updated"]
+            )
+
+
+repository = FirestoreRepository()
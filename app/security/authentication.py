@@ -3,6 +3,10 @@
 # Description: Handles Firebase Authentication and token verification.
 
 import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth, credentials
@@ -30,11 +34,129 @@ if not firebase_admin._apps:
 # Reusable dependency using a class for organization
 bearer_scheme = HTTPBearer()
 
+# --- Verified Token Cache ---
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+CERT_REFRESH_INTERVAL_SECONDS = float(os.getenv("CERT_REFRESH_INTERVAL_SECONDS", "1800"))
+
+# Google's public certificates for Firebase ID token signatures.
+ID_TOKEN_CERT_URI = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+
+class VerifiedTokenCache:
+    """
+    A bounded LRU cache of decoded claims for tokens that already passed verification.
+
+    Entries are keyed by a SHA-256 hash of the token, so raw tokens are never kept in
+    memory, and each entry expires at the token's own `exp` claim. Like the uncached
+    path, this does not check for revocation.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "cert_refreshes": 0, "cert_refresh_failures": 0}
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token_hash: str):
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token_hash)
+                    self._stats["hits"] += 1
+                    return dict(claims)
+                del self._entries[token_hash]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, token_hash: str, claims: dict):
+        with self._lock:
+            self._entries[token_hash] = (claims.get("exp", 0), claims)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def record_cert_refresh(self, succeeded: bool):
+        with self._lock:
+            self._stats["cert_refreshes" if succeeded else "cert_refresh_failures"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+token_cache = VerifiedTokenCache()
+
+
+_cert_refresh_stop = threading.Event()
+_cert_refresh_thread = None
+
+
+def _certificate_fetcher():
+    """
+    Returns the Firebase token verifier's HTTP cache request, or None if this Admin SDK
+    version doesn't have it. The SDK doesn't expose its verifier publicly, so it is reached
+    through private attributes that an upgrade may rename.
+    """
+    get_client = getattr(auth, "_get_client", None)
+    if get_client is None:
+        return None
+    verifier = getattr(get_client(firebase_admin.get_app()), "_token_verifier", None)
+    return getattr(verifier, "request", None)
+
+
+def _refresh_public_certificates(fetch):
+    """
+    Re-fetches Google's signing certificates through the Firebase token verifier's HTTP cache.
+
+    The verifier only downloads certificates when its cached copy is stale, which would
+    otherwise happen on a user request. Forcing a revalidation on a timer keeps the cached
+    copy fresh, so verifying an uncached token never waits on that download.
+    """
+    while not _cert_refresh_stop.is_set():
+        try:
+            fetch(ID_TOKEN_CERT_URI, headers={"Cache-Control": "no-cache"})
+            token_cache.record_cert_refresh(True)
+        except Exception as e:
+            token_cache.record_cert_refresh(False)
+            print(f"Could not refresh Firebase public certificates: {e}")
+        _cert_refresh_stop.wait(CERT_REFRESH_INTERVAL_SECONDS)
+
+
+def start_certificate_refresher():
+    """Starts refreshing the certificates in a background thread. Call it from the app's startup hook."""
+    global _cert_refresh_thread
+    if _cert_refresh_thread is not None and _cert_refresh_thread.is_alive():
+        return
+    fetch = _certificate_fetcher()
+    if fetch is None:
+        print("Firebase certificate refresh disabled: this Admin SDK version has no token verifier to refresh.")
+        return
+    _cert_refresh_stop.clear()
+    _cert_refresh_thread = threading.Thread(
+        target=_refresh_public_certificates, args=(fetch,), name="firebase-cert-refresh", daemon=True
+    )
+    _cert_refresh_thread.start()
+
+
+def stop_certificate_refresher():
+    """Stops the background refresh started by `start_certificate_refresher`."""
+    _cert_refresh_stop.set()
+
+
 def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
     """
     A FastAPI dependency that verifies the Firebase ID token from the
     Authorization header and returns the decoded user data.
 
+    Tokens that were already verified are served from `token_cache` until they expire.
     If the token is invalid or expired, it raises an HTTPException.
     """
     if not creds:
@@ -43,10 +165,16 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer_scheme
             detail="Bearer token missing",
         )
     
+    token_hash = VerifiedTokenCache.hash_token(creds.credentials)
+    cached_claims = token_cache.get(token_hash)
+    if cached_claims is not None:
+        return cached_claims
+
     try:
         # The core verification step
         decoded_token = auth.verify_id_token(creds.credentials)
-        return decoded_token
+        token_cache.put(token_hash, decoded_token)
+        return dict(decoded_token)
     except Exception as e:
         # This catches various Firebase exceptions (expired, revoked, invalid signature, etc.)
         raise HTTPException(
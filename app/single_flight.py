@@ -0,0 +1,119 @@
+# File: app/single_flight.py
+# Author: MCP Development Core
+# Description: Coalesces identical in-flight coroutine calls, optionally keeping the result for a short window.
+
+import copy
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time; concurrent callers with the same key
+    await the computation that is already running instead of starting their own.
+
+    A successful result is retained for `retain_seconds`, so callers that arrive just after
+    it finished are served without running it again. By default a result is successful when
+    it is not a dictionary with an "error" key; `should_retain` overrides that. Every caller
+    gets its own copy of the result.
+
+    The shared computation runs as its own task: a caller that is cancelled (e.g. its client
+    disconnected) stops waiting, but the others still get the result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        retain_seconds: float = 0.0,
+        max_retained: int = 256,
+        should_retain: Optional[Callable[[Any], bool]] = None
+    ):
+        self.name = name
+        self.retain_seconds = retain_seconds
+        self.max_retained = max_retained
+        self.should_retain = should_retain or (lambda result: not (isinstance(result, dict) and "error" in result))
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._retained = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "coalesced": 0, "retained_hits": 0}
+
+    def _get_retained(self, key: Hashable):
+        with self._lock:
+            entry = self._retained.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._retained[key]
+                return None
+            self._stats["retained_hits"] += 1
+            return result
+
+    def _retain(self, key: Hashable, result: Any):
+        if self.retain_seconds <= 0 or not self.should_retain(result):
+            return
+        with self._lock:
+            self._retained[key] = (time.monotonic() + self.retain_seconds, result)
+            self._retained.move_to_end(key)
+            while len(self._retained) > self.max_retained:
+                self._retained.popitem(last=False)
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]], use_retained: bool = True) -> Any:
+        """
+        Returns the result of `compute()` for `key`, sharing it with concurrent callers.
+
+        Args:
+            key: Identifies identical calls; build it from normalized inputs.
+            compute: Starts the computation. Only called when no identical call is running.
+            use_retained: Serve a recently retained result. Pass False when the caller asked
+                          for a fresh result; it still joins a computation already in flight,
+                          and the new result replaces the retained one.
+        """
+        if use_retained:
+            result = self._get_retained(key)
+            if result is not None:
+                return copy.deepcopy(result)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self._stats["runs"] += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+
+            def finished(done: asyncio.Task):
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+                if not done.cancelled() and done.exception() is None:
+                    self._retain(key, done.result())
+
+            task.add_done_callback(finished)
+        else:
+            self._stats["coalesced"] += 1
+
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._in_flight), "retained": len(self._retained)}
+
+
+# This allows us to test the coalescing directly
+if __name__ == '__main__':
+    calls = []
+
+    async def slow_square(x: int) -> dict:
+        calls.append(x)
+        await asyncio.sleep(0.1)
+        return {"value": x * x}
+
+    async def main():
+        flight = SingleFlight("test", retain_seconds=1.0)
+        results = await asyncio.gather(*(flight.run(("square", 3), lambda: slow_square(3)) for _ in range(10)))
+        print(f"10 concurrent callers, {len(calls)} computation: {results[0]}")
+        await flight.run(("square", 3), lambda: slow_square(3))
+        print(f"Retained hit, still {len(calls)} computation. Stats: {flight.stats()}")
+
+    asyncio.run(main())
@@ -96,14 +96,16 @@ document.addEventListener('DOMContentLoaded', () => {
     async function handleAnalysis(e) {
         e.preventDefault();
         if (!currentIdToken) return;
-        const niche = nicheInput.value;
-        const location = locationInput.value;
+        runAnalysis(nicheInput.value, locationInput.value, false);
+    }
+
+    async function runAnalysis(niche, location, forceLlm) {
         resultsContainer.innerHTML = `<p>Analyzing opportunity for "${niche}" in "${location}"...</p>`;
         try {
             const response = await fetch('/api/v1/analyze', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json', 'Authorization': `Bearer ${currentIdToken}` },
-                body: JSON.stringify({ niche, location })
+                body: JSON.stringify({ niche, location, force_llm: forceLlm })
             });
             const data = await response.json();
             if (!response.ok) throw new Error(data.detail || 'An unknown error occurred.');
@@ -120,30 +122,40 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         let html = `<h3>Analysis for "${data.niche}" in "${data.location}"</h3>
             <p><strong>Opportunity Score:</strong> ${data.opportunity_score || 'N/A'} / 100</p>
-            <p><strong>Justification:</strong> ${data.justification || 'N/A'}</p>
+            <p><strong>Justification:</strong> ${data.justification || 'N/A'}</p>`;
+        if (data.scoring_method === 'heuristic') {
+            // A clear-cut market is scored from on-page signals alone; the AI review is on request.
+            html += `<p><small>Quick estimate from competitors' on-page signals.</small>
+                <button class="ai-score-btn" data-niche="${data.niche}" data-location="${data.location}">Get AI analysis</button></p>`;
+        }
+        html += `
             <button class="generate-content-btn" data-niche="${data.niche}" data-location="${data.location}">
                 Generate Content & Edit
             </button>`;
         resultsContainer.innerHTML = html;
     }
     
-    async function loadUserSites() {
+    async function loadUserSites(cursor = null) {
         if (!currentIdToken) return;
-        assetList.innerHTML = '<li>Loading sites...</li>';
+        if (!cursor) assetList.innerHTML = '<li>Loading sites...</li>';
         try {
-            const response = await fetch('/api/v1/sites', {
+            const params = new URLSearchParams({ page_size: 20 });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`/api/v1/sites?${params}`, {
                 headers: { 'Authorization': `Bearer ${currentIdToken}` }
             });
-            const sites = await response.json();
-            if (!response.ok) throw new Error(sites.detail || 'Failed to load sites.');
-            renderUserSites(sites);
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.detail || 'Failed to load sites.');
+            renderUserSites(data.sites, data.next_cursor, Boolean(cursor));
         } catch (error) {
             assetList.innerHTML = `<li class="error-message">${error.message}</li>`;
         }
     }
 
-    function renderUserSites(sites) {
-        if (sites.length === 0) {
+    function renderUserSites(sites, nextCursor, append) {
+        const loadMoreItem = assetList.querySelector('.load-more-item');
+        if (loadMoreItem) loadMoreItem.remove();
+        if (!append && sites.length === 0) {
             assetList.innerHTML = '<li>No content found in CMS. Generate some above!</li>';
             return;
         }
@@ -161,7 +173,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 </li>
             `;
         });
-        assetList.innerHTML = html;
+        if (nextCursor) {
+            html += `<li class="load-more-item"><button class="load-more-sites-btn" data-cursor="${nextCursor}">Load more</button></li>`;
+        }
+        if (append) {
+            assetList.insertAdjacentHTML('beforeend', html);
+        } else {
+            assetList.innerHTML = html;
+        }
     }
 
     function handleDynamicClicks(e) {
@@ -173,6 +192,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (businessName && businessName.trim() !== "") {
                     startContentGeneration(businessName, niche, location);
                 }
+            } else if (e.target.classList.contains('ai-score-btn')) {
+                runAnalysis(e.target.dataset.niche, e.target.dataset.location, true);
+            } else if (e.target.classList.contains('load-more-sites-btn')) {
+                loadUserSites(e.target.dataset.cursor);
             } else if (e.target.classList.contains('edit-site-btn')) {
                 const siteId = e.target.dataset.siteId;
                 if (siteId && siteId !== 'undefined') {
@@ -212,22 +235,74 @@ document.addEventListener('DOMContentLoaded', () => {
     async function startContentGeneration(businessName, niche, location) {
         assetStatus.innerHTML = `<p>Generating initial content for "${businessName}"...</p>`;
         try {
-            const response = await fetch('/api/v1/generate-content', {
+            const response = await fetch('/api/v1/generate-content/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json', 'Authorization': `Bearer ${currentIdToken}` },
                 body: JSON.stringify({ business_name: businessName, niche, location })
             });
-            const data = await response.json();
-            if (!response.ok) throw new Error(data.detail || 'Failed to generate content.');
-            
-            editorState = { businessName, niche, location, ...data };
-            openContentEditor();
-            assetStatus.innerHTML = `<p>Content generated. Please review in the editor.</p>`;
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.detail || 'Failed to generate content.');
+            }
+
+            // Pages arrive one at a time; the editor opens as soon as we know the site structure.
+            await readEventStream(response, (event, data) => {
+                if (event === 'structure') {
+                    const content = {};
+                    Object.keys(data.site_structure).forEach(filename => { content[filename] = ''; });
+                    editorState = { businessName, niche, location, content, site_structure: data.site_structure };
+                    openContentEditor();
+                    assetStatus.innerHTML = `<p>Writing pages for "${businessName}"...</p>`;
+                } else if (event === 'delta') {
+                    updateEditorPage(data.filename, (editorState.content[data.filename] || '') + data.text);
+                } else if (event === 'page' || event === 'page_failed') {
+                    updateEditorPage(data.filename, data.content);
+                } else if (event === 'done') {
+                    if (data.failed_pages.length > 0) {
+                        assetStatus.innerHTML = `<p class="error-message">Content generated, but these pages failed and need to be written manually: ${data.failed_pages.join(', ')}</p>`;
+                    } else {
+                        assetStatus.innerHTML = `<p>Content generated. Please review in the editor.</p>`;
+                    }
+                }
+            });
         } catch (error) {
             assetStatus.innerHTML = `<p class="error-message">Error generating content: ${error.message}</p>`;
         }
     }
 
+    function updateEditorPage(filename, content) {
+        if (!editorState.content) return; // The editor was closed mid-stream.
+        editorState.content[filename] = content;
+        const activeTab = editorTabs.querySelector('.tab.active');
+        if (activeTab && activeTab.dataset.filename === filename) {
+            contentEditorTextarea.value = content;
+        }
+    }
+
+    async function readEventStream(response, onEvent) {
+        // EventSource cannot send an Authorization header, so parse the SSE stream from fetch.
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     function openContentEditor() {
         editorTabs.innerHTML = '';
         const filenames = Object.keys(editorState.content);
@@ -290,7 +365,9 @@ document.addEventListener('DOMContentLoaded', () => {
                     niche: editorState.niche,
                     location: editorState.location,
                     edited_content: editorState.content,
-                    site_structure: editorState.site_structure
+                    site_structure: editorState.site_structure,
+                    // Re-deploying an existing site pushes only the pages that changed.
+                    site_id: editorState.sanity_site_id
                 })
             });
             
@@ -303,8 +380,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }
             
             assetStatus.innerHTML = `<p>CMS push for "${businessNameForPolling}" is in progress. Task ID: ${data.task_id}</p>`;
-            // Pass the captured name to the polling function.
-            pollDeploymentStatus(data.task_id, businessNameForPolling);
+            // Pass the captured name to the status subscription.
+            subscribeToDeploymentStatus(data.task_id, businessNameForPolling);
         } catch (error) {
             // If the fetch itself fails, we still need to close the editor.
             closeContentEditor();
@@ -314,6 +391,42 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
 
+    async function subscribeToDeploymentStatus(taskId, businessName) {
+        // One authenticated request per task; the server pushes each stage as it happens.
+        let finished = false;
+        try {
+            const response = await fetch(`/api/v1/deployment-status/${taskId}/events`, {
+                headers: { 'Authorization': `Bearer ${currentIdToken}` }
+            });
+            if (!response.ok) throw new Error('Could not subscribe to task status.');
+            await readEventStream(response, (event, data) => {
+                if (event === 'progress') {
+                    assetStatus.innerHTML = `<p>CMS push for "${businessName}": ${data.stage}...</p>`;
+                } else if (event === 'status') {
+                    finished = true;
+                    renderDeploymentStatus(data, businessName);
+                }
+            });
+        } catch (error) {
+            console.warn(`Status stream unavailable, falling back to polling: ${error.message}`);
+        }
+        if (!finished) pollDeploymentStatus(taskId, businessName);
+    }
+
+    function renderDeploymentStatus(data, businessName) {
+        if (data.status === 'complete') {
+            const result = data.result;
+            let resultHTML = `<p><strong>Success!</strong> Content for "${businessName}" pushed to CMS.</p>`;
+            if (result.sanity_result && result.sanity_result.error) {
+                resultHTML += `<p class="error-message"><strong>CMS Error:</strong> ${result.sanity_result.error}</p>`;
+            }
+            assetStatus.innerHTML = resultHTML;
+            loadUserSites();
+        } else if (data.status === 'failed') {
+            assetStatus.innerHTML = `<p class="error-message"><strong>Failed!</strong> Task for "${businessName}" failed: ${data.error}</p>`;
+        }
+    }
+
     function pollDeploymentStatus(taskId, businessName) {
         const intervalId = setInterval(async () => {
             try {
@@ -327,18 +440,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 const data = await response.json();
 
-                if (data.status === 'complete') {
-                    clearInterval(intervalId);
-                    const result = data.result;
-                    let resultHTML = `<p><strong>Success!</strong> Content for "${businessName}" pushed to CMS.</p>`;
-                    if (result.sanity_result && result.sanity_result.error) {
-                        resultHTML += `<p class="error-message"><strong>CMS Error:</strong> ${result.sanity_result.error}</p>`;
-                    }
-                    assetStatus.innerHTML = resultHTML;
-                    loadUserSites();
-                } else if (data.status === 'failed') {
+                if (data.status === 'complete' || data.status === 'failed') {
                     clearInterval(intervalId);
-                    assetStatus.innerHTML = `<p class="error-message"><strong>Failed!</strong> Task for "${businessName}" failed: ${data.error}</p>`;
+                    renderDeploymentStatus(data, businessName);
                 }
             } catch (error) {
                 clearInterval(intervalId);
@@ -0,0 +1,412 @@
+# File: app/task_queue.py
+# Author: MCP Development Core
+# Description: A durable background task queue with a pluggable store and an async worker pool.
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import sqlite3
+import inspect
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+TASK_DB_PATH = Path(os.getenv("TASK_DB_PATH", ".data/tasks.sqlite3"))
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "4"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+TASK_RESULT_TTL_SECONDS = float(os.getenv("TASK_RESULT_TTL_SECONDS", str(24 * 3600)))
+
+# Task lifecycle: queued -> in_progress -> complete | failed.
+# A task whose attempt fails goes back to "queued" with a later run_at until it runs out of attempts.
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+COMPLETE = "complete"
+FAILED = "failed"
+
+
+class TaskStore(ABC):
+    """
+    The storage interface behind the task queue.
+
+    Any implementation that every worker process can reach (a shared database, Firestore,
+    Redis, ...) lets tasks be enqueued, claimed and polled from different processes.
+    """
+
+    @abstractmethod
+    def create(self, task_type: str, payload: dict, owner_id: Optional[str], max_attempts: int) -> str:
+        ...
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def claim_next(self, lease_seconds: float) -> Optional[dict]:
+        """Atomically marks the next runnable task as in progress and returns it."""
+
+    @abstractmethod
+    def renew_lease(self, task_id: str, attempt: int, lease_seconds: float) -> bool:
+        """
+        Extends the lease of a task still held on `attempt` to `lease_seconds` from now.
+        Returns False if the task is no longer held on that attempt (it was reclaimed or finished).
+        """
+
+    @abstractmethod
+    def complete(self, task_id: str, result: Any):
+        ...
+
+    @abstractmethod
+    def fail(self, task_id: str, error: str, retry_at: Optional[float]):
+        """Records a failed attempt; the task is re-queued at `retry_at`, or failed for good if None."""
+
+    @abstractmethod
+    def add_event(self, task_id: str, stage: str, detail: Optional[dict] = None):
+        """Appends a progress event to a task's event log."""
+
+    @abstractmethod
+    def get_events(self, task_id: str, after_id: int = 0) -> List[dict]:
+        """Returns the task's events with an ID greater than `after_id`, oldest first."""
+
+    @abstractmethod
+    def fail_expired(self, error: str) -> int:
+        """
+        Marks tasks whose lease expired on their last attempt as failed and returns how many.
+        Such a task's worker died or hung, and claim_next won't hand it out again.
+        """
+
+    @abstractmethod
+    def cleanup(self, older_than: float) -> int:
+        """Deletes finished tasks last updated before `older_than` and returns how many were removed."""
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    The default task store: a local SQLite file in WAL mode.
+
+    All uvicorn workers on one host can share the file. Tasks survive restarts, and a task
+    held by a worker that died is picked up again once its lease expires, as long as it has
+    attempts left.
+    """
+
+    def __init__(self, db_path: Path = TASK_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10.0, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id TEXT PRIMARY KEY, task_type TEXT NOT NULL, owner_id TEXT, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+            " result TEXT, error TEXT, run_at REAL NOT NULL, lease_expires_at REAL,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_runnable ON tasks (status, run_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, stage TEXT NOT NULL,"
+            " detail TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events (task_id, id)")
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> dict:
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["result"] = json.loads(task["result"]) if task["result"] is not None else None
+        return task
+
+    def create(self, task_type: str, payload: dict, owner_id: Optional[str], max_attempts: int) -> str:
+        task_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (id, task_type, owner_id, payload, status, max_attempts, run_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, task_type, owner_id, json.dumps(payload), QUEUED, max_attempts, now, now, now)
+            )
+        return task_id
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def claim_next(self, lease_seconds: float) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same task.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM tasks"
+                    " WHERE (status = ? AND run_at <= ?)"
+                    " OR (status = ? AND lease_expires_at < ? AND attempts < max_attempts)"
+                    " ORDER BY run_at LIMIT 1",
+                    (QUEUED, now, IN_PROGRESS, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, attempts = attempts + 1, lease_expires_at = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (IN_PROGRESS, now + lease_seconds, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        task = self._row_to_task(row)
+        task["status"] = IN_PROGRESS
+        task["attempts"] += 1
+        return task
+
+    def renew_lease(self, task_id: str, attempt: int, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE tasks SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+                (now + lease_seconds, now, task_id, IN_PROGRESS, attempt)
+            ).rowcount == 1
+
+    def complete(self, task_id: str, result: Any):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_expires_at = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (COMPLETE, json.dumps(result, default=str), time.time(), task_id)
+            )
+
+    def fail(self, task_id: str, error: str, retry_at: Optional[float]):
+        status = QUEUED if retry_at is not None else FAILED
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, run_at = COALESCE(?, run_at), lease_expires_at = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (status, error, retry_at, time.time(), task_id)
+            )
+
+    def add_event(self, task_id: str, stage: str, detail: Optional[dict] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO task_events (task_id, stage, detail, created_at) VALUES (?, ?, ?, ?)",
+                (task_id, stage, json.dumps(detail) if detail is not None else None, time.time())
+            )
+
+    def get_events(self, task_id: str, after_id: int = 0) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, stage, detail, created_at FROM task_events WHERE task_id = ? AND id > ? ORDER BY id",
+                (task_id, after_id)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "stage": row["stage"],
+                "detail": json.loads(row["detail"]) if row["detail"] is not None else None,
+                "created_at": row["created_at"]
+            }
+            for row in rows
+        ]
+
+    def fail_expired(self, error: str) -> int:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ?"
+                " WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                (FAILED, error, now, IN_PROGRESS, now)
+            ).rowcount
+
+    def cleanup(self, older_than: float) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM task_events WHERE task_id IN ("
+                    " SELECT id FROM tasks WHERE status IN (?, ?) AND updated_at < ?)",
+                    (COMPLETE, FAILED, older_than)
+                )
+                removed = self._conn.execute(
+                    "DELETE FROM tasks WHERE status IN (?, ?) AND updated_at < ?",
+                    (COMPLETE, FAILED, older_than)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+
+class TaskWorkerPool:
+    """
+    Runs queued tasks from a TaskStore on a fixed number of asyncio workers.
+
+    Handlers are registered per task type and are called as `handler(task_id, payload)`.
+    Plain functions run in a thread so they don't block the event loop; coroutine
+    functions are awaited directly. A handler signals failure by raising, and the task is
+    retried with exponential backoff until it has used `max_attempts` attempts. Handlers
+    can call `report_progress` to publish stage events to status subscribers.
+
+    While a handler runs, its worker renews the task's lease every third of `lease_seconds`,
+    so a long task is never reclaimed while its worker is alive. The lease only runs out
+    when the worker dies or its event loop stalls for longer than `lease_seconds`.
+    """
+
+    def __init__(
+        self,
+        store: TaskStore,
+        concurrency: int = TASK_WORKERS,
+        poll_interval: float = 0.5,
+        lease_seconds: float = 600.0,
+        base_backoff: float = 2.0,
+        result_ttl: float = TASK_RESULT_TTL_SECONDS
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.base_backoff = base_backoff
+        self.result_ttl = result_ttl
+        self._handlers: Dict[str, Callable] = {}
+        self._workers = []
+        self._stopping = asyncio.Event()
+
+    def register(self, task_type: str, handler: Callable):
+        """Registers the function that runs tasks of `task_type`."""
+        self._handlers[task_type] = handler
+
+    def enqueue(self, task_type: str, payload: dict, owner_id: Optional[str] = None,
+                max_attempts: int = TASK_MAX_ATTEMPTS) -> str:
+        """Stores a new task for any worker to pick up and returns its ID."""
+        if task_type not in self._handlers:
+            raise ValueError(f"No handler registered for task type '{task_type}'.")
+        return self.store.create(task_type, payload, owner_id, max_attempts)
+
+    def get_status(self, task_id: str) -> Optional[dict]:
+        """Returns the client-facing view of a task: its status plus a result or error."""
+        task = self.store.get(task_id)
+        if task is None:
+            return None
+        status = {"task_id": task["id"], "owner_id": task["owner_id"], "status": task["status"], "attempts": task["attempts"]}
+        if task["status"] == COMPLETE:
+            status["result"] = task["result"]
+        elif task["error"]:
+            status["error"] = task["error"]
+        return status
+
+    def report_progress(self, task_id: str, stage: str, detail: Optional[dict] = None):
+        """Publishes a progress event for a task. Safe to call from handler threads."""
+        try:
+            self.store.add_event(task_id, stage, detail)
+        except Exception as e:
+            # Progress is informational; it must never fail the task itself.
+            print(f"Could not record progress for task {task_id}: {e}")
+
+    def get_events(self, task_id: str, after_id: int = 0) -> List[dict]:
+        """Returns a task's progress events newer than `after_id`."""
+        return self.store.get_events(task_id, after_id)
+
+    async def start(self):
+        """Starts the workers and the periodic cleanup of finished tasks."""
+        self._stopping.clear()
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        self._workers.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def stop(self):
+        """Stops the workers. Tasks they were running are retried after their lease expires."""
+        self._stopping.set()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                task = await asyncio.to_thread(self.store.claim_next, self.lease_seconds)
+            except Exception as e:
+                print(f"Task worker could not claim a task: {e}")
+                task = None
+            if task is None:
+                await self._sleep(self.poll_interval)
+                continue
+            await self._run(task)
+
+    async def _keep_lease(self, task: dict):
+        """Renews a running task's lease until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    self.store.renew_lease, task["id"], task["attempts"], self.lease_seconds
+                )
+            except Exception as e:
+                # The next renewal may still succeed before the lease runs out.
+                print(f"Could not renew the lease of task {task['id']}: {e}")
+                continue
+            if not renewed:
+                print(f"Task {task['id']} attempt {task['attempts']} lost its lease.")
+                return
+
+    async def _run(self, task: dict):
+        handler = self._handlers.get(task["task_type"])
+        await asyncio.to_thread(self.report_progress, task["id"], "started", {"attempt": task["attempts"]})
+        heartbeat = asyncio.create_task(self._keep_lease(task))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for task type '{task['task_type']}'.")
+            if inspect.iscoroutinefunction(handler):
+                result = await handler(task["id"], task["payload"])
+            else:
+                result = await asyncio.to_thread(handler, task["id"], task["payload"])
+            await asyncio.to_thread(self.store.complete, task["id"], result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retry_at = None
+            if handler is not None and task["attempts"] < task["max_attempts"]:
+                backoff = self.base_backoff * (2 ** (task["attempts"] - 1))
+                retry_at = time.time() + backoff + random.uniform(0, backoff / 2)
+            print(f"Task {task['id']} attempt {task['attempts']} failed: {e}")
+            await asyncio.to_thread(self.store.fail, task["id"], str(e), retry_at)
+            if retry_at is not None:
+                await asyncio.to_thread(self.report_progress, task["id"], "retry scheduled", {
+                    "attempt": task["attempts"],
+                    "error": str(e),
+                    "retry_in_seconds": round(retry_at - time.time(), 1)
+                })
+        finally:
+            heartbeat.cancel()
+
+    async def _cleanup_loop(self):
+        while not self._stopping.is_set():
+            try:
+                # A task that took its worker down on every attempt is never reclaimed; close it out.
+                expired = await asyncio.to_thread(
+                    self.store.fail_expired, "The task's worker stopped responding on its last attempt."
+                )
+                if expired:
+                    print(f"Marked {expired} tasks with expired leases as failed.")
+                removed = await asyncio.to_thread(self.store.cleanup, time.time() - self.result_ttl)
+                if removed:
+                    print(f"Removed {removed} expired tasks.")
+            except Exception as e:
+                print(f"Task cleanup failed: {e}")
+            await self._sleep(min(self.result_ttl, 300.0))
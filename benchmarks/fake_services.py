@@ -0,0 +1,264 @@
+# File: benchmarks/fake_services.py
+# Author: MCP Development Core
+# Description: Local stand-ins for the external services, so the pipelines can be benchmarked offline.
+
+import re
+import json
+import hashlib
+import time
+import uuid
+import random
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_CORPUS = Path(__file__).parent / "corpus"
+
+
+class LatencyProfile:
+    """A response delay of `mean_ms` plus or minus up to `jitter_ms`, uniformly distributed."""
+
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+
+    def wait(self):
+        delay_ms = self.mean_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Routes requests to the owning stand-in and keeps the console quiet."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Optional[dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.stand_in.record_request()
+        self.server.stand_in.handle(self, "GET", None)
+
+    def do_POST(self):
+        self.server.stand_in.record_request()
+        self.server.stand_in.handle(self, "POST", self._read_json())
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when an async client opens
+    # dozens at once; real APIs don't, so neither should their stand-ins.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class StandInServer(ABC):
+    """An HTTP stand-in for one external service, served from a background thread."""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None):
+        self.latency = latency or LatencyProfile()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server = _StandInHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def record_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def start(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @abstractmethod
+    def handle(self, request: _StandInHandler, method: str, body: Optional[dict]):
+        """Answers one request through `request`; `body` is the parsed JSON body, if any."""
+
+
+class CompetitorSiteFarm(StandInServer):
+    """
+    Serves saved competitor pages for any path, each with its own latency and jitter.
+    Pages carry an ETag and answer a matching If-None-Match with 304 Not Modified.
+    """
+
+    def __init__(self, latency: Optional[LatencyProfile] = None, corpus: Path = DEFAULT_CORPUS):
+        super().__init__(latency)
+        self.pages = [path.read_bytes() for path in sorted(Path(corpus).glob("*.html"))]
+        if not self.pages:
+            raise ValueError(f"No *.html pages found in {corpus}")
+
+    def handle(self, request, method, body):
+        self.latency.wait()
+        # The same path always returns the same page.
+        page = self.pages[sum(request.path.encode("utf-8")) % len(self.pages)]
+        etag = f'"{hashlib.sha1(page).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            request._send(304, b"", "text/html; charset=utf-8", {"ETag": etag})
+        else:
+            request._send(200, page, "text/html; charset=utf-8", {"ETag": etag})
+
+
+class SearchStandIn(StandInServer):
+    """Answers Custom Search JSON API queries with links into the competitor site farm."""
+
+    def __init__(self, farm: CompetitorSiteFarm, latency: Optional[LatencyProfile] = None, results: int = 10):
+        super().__init__(latency)
+        self.farm = farm
+        self.results = results
+
+    def handle(self, request, method, body):
+        self.latency.wait()
+        query = parse_qs(urlparse(request.path).query).get("q", [""])[0]
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+        items = [
+            {
+                "title": f"Competitor {i} | {query}",
+                "link": f"{self.farm.url}/{slug}/competitor-{i}/",
+                "snippet": f"Result {i} for {query}."
+            }
+            for i in range(self.results)
+        ]
+        request._send(200, json.dumps({"items": items}).encode("utf-8"), "application/json")
+
+
+class GeminiStandIn(StandInServer):
+    """
+    Answers Gemini REST generateContent calls.
+
+    Scoring prompts get a JSON opportunity score back (an array of them for batched
+    prompts); every other prompt gets a page of HTML. streamGenerateContent returns the same text split over several chunks,
+    as a JSON array or, with alt=sse, as Server-Sent Events.
+    """
+
+    PAGE_HTML = "<h1>{topic}</h1>" + "".join(
+        f"<h2>Section {i}</h2><p>{'Reliable local service you can trust. ' * 20}</p>" for i in range(4)
+    )
+
+    def _reply_text(self, prompt: str) -> str:
+        if "Return a JSON array" in prompt:
+            return json.dumps([
+                {"id": int(market_id), "opportunity_score": random.randint(20, 95), "justification": "Stand-in score."}
+                for market_id in re.findall(r'\{"id":(\d+),"niche"', prompt)
+            ])
+        if "Opportunity Score" in prompt:
+            return json.dumps({
+                "opportunity_score": random.randint(20, 95),
+                "justification": "Stand-in score from the benchmark Gemini service."
+            })
+        topic = re.search(r"\*\*Page Topic:\*\* (.+)", prompt)
+        return self.PAGE_HTML.format(topic=topic.group(1) if topic else "Page")
+
+    @staticmethod
+    def _candidate(text: str) -> dict:
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": 1, "index": 0}],
+            "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": len(text) // 4}
+        }
+
+    def handle(self, request, method, body):
+        self.latency.wait()
+        prompt = "".join(
+            part.get("text", "")
+            for content in (body or {}).get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = self._reply_text(prompt)
+        if ":streamGenerateContent" in request.path:
+            step = max(len(text) // 4, 1)
+            chunks = [self._candidate(text[i:i + step]) for i in range(0, len(text), step)]
+            if parse_qs(urlparse(request.path).query).get("alt") == ["sse"]:
+                events = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks)
+                request._send(200, events.encode("utf-8"), "text/event-stream")
+            else:
+                request._send(200, json.dumps(chunks).encode("utf-8"), "application/json")
+        else:
+            request._send(200, json.dumps(self._candidate(text)).encode("utf-8"), "application/json")
+
+
+class SanityStandIn(StandInServer):
+    """Accepts Sanity HTTP mutate requests and answers like the real API."""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None):
+        super().__init__(latency)
+        self.documents: Dict[str, dict] = {}
+        self._documents_lock = threading.Lock()
+
+    def handle(self, request, method, body):
+        self.latency.wait()
+        query = parse_qs(urlparse(request.path).query)
+        return_documents = query.get("returnDocuments", ["false"])[0] == "true"
+        results = []
+        with self._documents_lock:
+            for mutation in (body or {}).get("mutations", []):
+                operation, document = next(iter(mutation.items()))
+                if operation == "delete":
+                    self.documents.pop(document["id"], None)
+                    results.append({"id": document["id"], "operation": "delete"})
+                    continue
+                document = dict(document)
+                document.setdefault("_id", str(uuid.uuid4()))
+                if operation == "createOrReplace":
+                    operation = "update" if document["_id"] in self.documents else "create"
+                self.documents[document["_id"]] = document
+                result = {"id": document["_id"], "operation": operation}
+                if return_documents:
+                    result["document"] = document
+                results.append(result)
+        payload = {"transactionId": uuid.uuid4().hex, "results": results}
+        request._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+class InMemoryRepository:
+    """
+    Stands in for the Firestore repository when no emulator is available.
+
+    Implements the methods the endpoints and the CMS push task call, with the same return shapes.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+        self.sites: Dict[str, Dict[str, dict]] = {}
+
+    async def get_user_settings(self, user_id: str) -> dict:
+        return dict(self.users.get(user_id, {}))
+
+    async def save_user_settings(self, user_id: str, settings: dict):
+        self.users.setdefault(user_id, {}).update(settings)
+
+    async def list_sites(self, user_id: str, page_size: int = 20, cursor: Optional[str] = None) -> dict:
+        sites = [{"site_id": site_id, **record} for site_id, record in self.sites.get(user_id, {}).items()]
+        return {"sites": sites[:page_size], "next_cursor": None}
+
+    async def get_site(self, user_id: str, site_id: str) -> Optional[dict]:
+        return self.sites.get(user_id, {}).get(site_id)
+
+    async def save_site(self, user_id: str, site_id: str, record: dict):
+        self.sites.setdefault(user_id, {}).setdefault(site_id, {}).update(record)
+
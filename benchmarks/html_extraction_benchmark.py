@@ -0,0 +1,79 @@
+# File: benchmarks/html_extraction_benchmark.py
+# Author: MCP Development Core
+# Description: Measures per-page CPU time and peak memory of each HTML extraction backend.
+#
+# Usage (from the project root):
+#   python -m benchmarks.html_extraction_benchmark [--corpus DIR] [--repeat N] [--chunk-size BYTES]
+#
+# The default corpus is benchmarks/corpus. Point --corpus at a directory of saved competitor
+# pages (*.html) to benchmark against real sites.
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.agents.tools.html_extraction import EXTRACTORS, create_extractor
+
+DEFAULT_CORPUS = Path(__file__).parent / "corpus"
+
+
+def _extract_in_chunks(backend: str, html: str, chunk_size: int) -> dict:
+    """Feeds a page to an extractor the way the scraper does: in download-sized chunks."""
+    extractor = create_extractor(backend)
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start:start + chunk_size])
+        if extractor.is_complete:
+            break
+    return extractor.close()
+
+
+def benchmark_backend(backend: str, pages: dict, repeat: int, chunk_size: int) -> dict:
+    """Returns the mean CPU milliseconds and peak KiB per page for one backend."""
+    cpu_seconds = 0.0
+    peak_bytes = 0
+    for html in pages.values():
+        start = time.process_time()
+        for _ in range(repeat):
+            _extract_in_chunks(backend, html, chunk_size)
+        cpu_seconds += (time.process_time() - start) / repeat
+
+        # Memory is measured on a separate run so tracing doesn't distort the timings.
+        tracemalloc.start()
+        _extract_in_chunks(backend, html, chunk_size)
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "cpu_ms_per_page": cpu_seconds / len(pages) * 1000,
+        "peak_kib": peak_bytes / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extraction backends.")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    args = parser.parse_args()
+
+    pages = {path.name: path.read_text(encoding="utf-8", errors="replace") for path in sorted(args.corpus.glob("*.html"))}
+    if not pages:
+        raise SystemExit(f"No *.html pages found in {args.corpus}")
+    total_kib = sum(len(html) for html in pages.values()) / 1024
+    print(f"--- HTML extraction benchmark: {len(pages)} pages, {total_kib:.0f} KiB, {args.repeat} runs each ---")
+
+    # Every backend must agree before its speed means anything.
+    reference = {name: _extract_in_chunks("bs4", html, args.chunk_size) for name, html in pages.items()}
+    for backend in EXTRACTORS:
+        mismatches = [
+            name for name, html in pages.items()
+            if _extract_in_chunks(backend, html, args.chunk_size) != reference[name]
+        ]
+        result = benchmark_backend(backend, pages, args.repeat, args.chunk_size)
+        note = f"  (differs from bs4 on: {', '.join(mismatches)})" if mismatches else ""
+        print(f"  {backend:<7} {result['cpu_ms_per_page']:8.3f} ms CPU/page   {result['peak_kib']:9.1f} KiB peak{note}")
+
+
+if __name__ == '__main__':
+    main()
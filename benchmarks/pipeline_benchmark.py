@@ -0,0 +1,250 @@
+# File: benchmarks/pipeline_benchmark.py
+# Author: MCP Development Core
+# Description: Load-tests the analyze, generate and CMS push endpoints against local service stand-ins.
+#
+# Usage (from the project root):
+#   python -m benchmarks.pipeline_benchmark [--concurrency N] [--requests N] [--scenarios analyze,generate,assemble]
+#                                           [--site-latency MS] [--site-jitter MS] [--llm-latency MS] [...]
+#
+# Search, the competitor sites, Gemini and Sanity are all served from local threads, so no
+# API keys or network access are needed. Firestore uses the emulator when
+# FIRESTORE_EMULATOR_HOST is set, otherwise an in-memory stand-in. Every request uses a
+# unique niche, so the response caches start cold.
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+from typing import Dict, List, Tuple
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_services import (
+    CompetitorSiteFarm, GeminiStandIn, InMemoryRepository, LatencyProfile, SanityStandIn, SearchStandIn
+)
+
+SCENARIOS = ("analyze", "generate", "assemble")
+STATUS_POLL_SECONDS = 0.05
+
+
+def _write_throwaway_service_account(directory: str) -> str:
+    """Writes a syntactically valid service account file so firebase_admin can initialise."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode("utf-8")
+    path = os.path.join(directory, "service-account.json")
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "benchmark-project",
+            "private_key_id": uuid.uuid4().hex,
+            "private_key": pem,
+            "client_email": "benchmark@benchmark-project.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": "https://oauth2.googleapis.com/token"
+        }, f)
+    return path
+
+
+def _configure_environment(args, workdir: str, search: SearchStandIn, gemini: GeminiStandIn, sanity: SanityStandIn):
+    """Points the app at the stand-ins. Must run before anything under `app` is imported."""
+    os.environ.update({
+        "GOOGLE_API_KEY": "benchmark-key",
+        "GOOGLE_SEARCH_ENGINE_ID": "benchmark-cx",
+        "GOOGLE_SEARCH_API_ENDPOINT": search.url,
+        "GEMINI_API_ENDPOINT": gemini.url,
+        "SANITY_PROJECT_ID": "benchmark",
+        "SANITY_API_KEY": "benchmark-token",
+        "SANITY_API_HOST": sanity.url,
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "TASK_DB_PATH": os.path.join(workdir, "tasks.sqlite3"),
+        "TASK_WORKERS": str(args.task_workers),
+        "FIREBASE_CREDENTIALS_PATH": _write_throwaway_service_account(workdir),
+    })
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_app_server(app) -> Tuple[uvicorn.Server, str]:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def _analyze(client: httpx.AsyncClient, n: int, run_id: str) -> Dict[str, float]:
+    response = await client.post("/api/v1/analyze", json={"niche": f"plumber {run_id} {n}", "location": "Denver"})
+    response.raise_for_status()
+    if "error" in response.json():
+        raise RuntimeError(response.json()["error"])
+    return {}
+
+
+async def _generate(client: httpx.AsyncClient, n: int, run_id: str) -> Dict[str, float]:
+    response = await client.post("/api/v1/generate-content", json={
+        "business_name": f"Benchmark Co {n}", "niche": f"roofer {run_id} {n}", "location": "Austin"
+    })
+    response.raise_for_status()
+    if not response.json().get("success"):
+        raise RuntimeError(response.json().get("error", "Content generation failed."))
+    return {}
+
+
+async def _assemble(client: httpx.AsyncClient, n: int, run_id: str) -> Dict[str, float]:
+    """Measures how long the push takes to be accepted and, separately, to complete."""
+    from app.agents.digital_asset_generator import build_site_structure
+
+    niche = f"electrician {run_id} {n}"
+    site_structure = build_site_structure(niche)
+    started = time.perf_counter()
+    response = await client.post("/api/v1/assemble-and-deploy", json={
+        "business_name": f"Benchmark Co {n}",
+        "niche": niche,
+        "location": "Seattle",
+        "edited_content": {key: GeminiStandIn.PAGE_HTML.format(topic=page["title"]) for key, page in site_structure.items()},
+        "site_structure": site_structure
+    })
+    response.raise_for_status()
+    accepted = time.perf_counter() - started
+
+    task_id = response.json()["task_id"]
+    while True:
+        status_response = await client.get(f"/api/v1/deployment-status/{task_id}")
+        status_response.raise_for_status()
+        task = status_response.json()
+        if task["status"] == "complete":
+            return {"accept": accepted}
+        if task["status"] == "failed":
+            raise RuntimeError(task.get("error", "The CMS push failed."))
+        await asyncio.sleep(STATUS_POLL_SECONDS)
+
+
+async def run_scenario(base_url: str, scenario: str, total: int, concurrency: int) -> dict:
+    """Sends `total` requests, at most `concurrency` at a time, and collects latencies and errors."""
+    call = {"analyze": _analyze, "generate": _generate, "assemble": _assemble}[scenario]
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    extra: Dict[str, List[float]] = {}
+    errors: List[str] = []
+
+    async def one(client: httpx.AsyncClient, n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                for name, value in (await call(client, n, run_id)).items():
+                    extra.setdefault(name, []).append(value)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e) or type(e).__name__)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits,
+                                 headers={"Authorization": "Bearer benchmark"}) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, n) for n in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {"latencies": latencies, "extra": extra, "errors": errors, "elapsed": elapsed}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else float("nan")
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+def _report(scenario: str, result: dict, total: int, out):
+    ok = len(result["latencies"])
+    p = _percentiles(result["latencies"])
+    print(f"  {scenario:<9} p50 {p['p50']:8.1f} ms   p95 {p['p95']:8.1f} ms   p99 {p['p99']:8.1f} ms   "
+          f"{ok / result['elapsed']:7.2f} req/s   {len(result['errors'])}/{total} errors", file=out)
+    for name, samples in result["extra"].items():
+        p = _percentiles(samples)
+        print(f"    {name:<7} p50 {p['p50']:8.1f} ms   p95 {p['p95']:8.1f} ms   p99 {p['p99']:8.1f} ms", file=out)
+    for error in sorted(set(result["errors"]))[:5]:
+        print(f"    error: {error}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API pipelines against local service stand-ins.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--task-workers", type=int, default=4)
+    parser.add_argument("--search-latency", type=float, default=150, help="Mean search latency in ms.")
+    parser.add_argument("--site-latency", type=float, default=300, help="Mean competitor page latency in ms.")
+    parser.add_argument("--site-jitter", type=float, default=200, help="Competitor page jitter in ms.")
+    parser.add_argument("--llm-latency", type=float, default=800, help="Mean Gemini latency in ms.")
+    parser.add_argument("--llm-jitter", type=float, default=300, help="Gemini jitter in ms.")
+    parser.add_argument("--sanity-latency", type=float, default=200, help="Mean Sanity mutate latency in ms.")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own progress output.")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    farm = CompetitorSiteFarm(LatencyProfile(args.site_latency, args.site_jitter)).start()
+    search = SearchStandIn(farm, LatencyProfile(args.search_latency, args.search_latency / 4)).start()
+    gemini = GeminiStandIn(LatencyProfile(args.llm_latency, args.llm_jitter)).start()
+    sanity = SanityStandIn(LatencyProfile(args.sanity_latency, args.sanity_latency / 4)).start()
+
+    with tempfile.TemporaryDirectory(prefix="pipeline-benchmark-") as workdir:
+        _configure_environment(args, workdir, search, gemini, sanity)
+
+        import app.main
+        from app.security.authentication import get_current_user
+
+        app.main.app.dependency_overrides[get_current_user] = lambda: {"uid": "benchmark-user", "email": "benchmark@example.com"}
+        if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+            app.main.repository = InMemoryRepository()
+
+        # The pipelines print their progress; keep it out of the report unless asked for.
+        out = sys.stdout
+        if not args.verbose:
+            sys.stdout = open(os.devnull, "w")
+
+        server, base_url = _start_app_server(app.main.app)
+        print(f"--- Pipeline benchmark: {args.requests} requests per scenario, concurrency {args.concurrency} ---", file=out)
+        print(f"    latency (ms): search {args.search_latency:.0f}, sites {args.site_latency:.0f}±{args.site_jitter:.0f}, "
+              f"gemini {args.llm_latency:.0f}±{args.llm_jitter:.0f}, sanity {args.sanity_latency:.0f}", file=out)
+        try:
+            for scenario in scenarios:
+                result = asyncio.run(run_scenario(base_url, scenario, args.requests, args.concurrency))
+                _report(scenario, result, args.requests, out)
+        finally:
+            server.should_exit = True
+            for stand_in in (farm, search, gemini, sanity):
+                stand_in.stop()
+            if sys.stdout is not out:
+                sys.stdout.close()
+                sys.stdout = out
+
+        print(f"    upstream calls: search {search.request_count}, sites {farm.request_count}, "
+              f"gemini {gemini.request_count}, sanity {sanity.request_count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# File: benchmarks/site_assembly_benchmark.py
+# Author: MCP Development Core
+# Description: Measures the cost of assembling generated sites, from a handful of pages to hundreds of service pages.
+#
+# Usage (from the project root):
+#   python -m benchmarks.site_assembly_benchmark [--service-pages 1,100,500] [--repeat N] [--content-kib KIB]
+#
+# Each site has a home, about and contact page plus the given number of service pages, all
+# linked from the nav. Three ways of rendering them are compared, each including the
+# in-memory build (encoding and hashing every page):
+#   format  str.format on a template string per page, with the nav markup rebuilt per page
+#   jinja   the compiled Jinja2 page template rendered in full for every page
+#   shell   the compiled template rendered once per site, pages filled into its slots
+
+import argparse
+import time
+from html import escape
+
+from markupsafe import Markup
+
+from app.agents.digitalold_asset_generator import build_site_artifact
+from app.agents.tools.site_artifact import SiteArtifact
+from app.agents.tools.site_templates import build_nav, get_page_template
+
+# The page template string the assembler formatted before the Jinja2 templates.
+FORMAT_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: sans-serif; line-height: 1.6; padding: 20px; max-width: 800px; margin: auto; }}
+        nav a {{ margin-right: 15px; }}
+        header, footer {{ text-align: center; padding: 20px 0; }}
+    </style>
+    {schema_script}
+</head>
+<body>
+    <header>
+        <h1>{business_name}</h1>
+        <nav>
+            {nav}
+        </nav>
+    </header>
+    <main>
+        {page_content}
+    </main>
+    <footer>
+        <p>&copy; 2025 {business_name}. All Rights Reserved.</p>
+    </footer>
+</body>
+</html>
+"""
+
+BUSINESS_NAME = "Apex Roofing & Repair"
+SCHEMA_SCRIPT = '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "RoofingContractor"}</script>'
+
+
+def build_site(service_pages: int, content_kib: int) -> tuple:
+    """Returns (site_structure, edited_content) for a site with `service_pages` service pages."""
+    site_structure = {"index.html": {"topic": "Home Page", "title": "Home"}}
+    for i in range(service_pages):
+        site_structure[f"service-{i}.html"] = {"topic": f"Roof Service {i}", "title": f"Roof Service {i}"}
+    site_structure["about.html"] = {"topic": "About Us", "title": "About Us"}
+    site_structure["contact.html"] = {"topic": "Contact Us", "title": "Contact Us"}
+
+    paragraph = "<p>" + "Reliable local roofing you can trust. " * 25 + "</p>"
+    body = paragraph * max(1, content_kib * 1024 // len(paragraph))
+    edited_content = {filename: f"<h1>{info['title']}</h1>{body}" for filename, info in site_structure.items()}
+    return site_structure, edited_content
+
+
+def assemble_format(site_structure: dict, edited_content: dict) -> SiteArtifact:
+    artifact = SiteArtifact()
+    for filename, page_info in site_structure.items():
+        nav = "\n            ".join(
+            f'<a href="{link["href"]}">{escape(link["title"])}</a>' for link in build_nav(site_structure)
+        )
+        artifact.add(filename, FORMAT_TEMPLATE.format(
+            title=escape(page_info["title"]),
+            schema_script=SCHEMA_SCRIPT if filename == "index.html" else "",
+            business_name=escape(BUSINESS_NAME),
+            nav=nav,
+            page_content=edited_content[filename]
+        ))
+    return artifact
+
+
+def assemble_jinja(site_structure: dict, edited_content: dict) -> SiteArtifact:
+    template = get_page_template()
+    nav = build_nav(site_structure)
+    artifact = SiteArtifact()
+    for filename, page_info in site_structure.items():
+        artifact.add(filename, template.render(
+            title=page_info["title"],
+            head_extra=Markup(SCHEMA_SCRIPT if filename == "index.html" else ""),
+            business_name=BUSINESS_NAME,
+            nav=nav,
+            year=2025,
+            content=Markup(edited_content[filename])
+        ))
+    return artifact
+
+
+def assemble_shell(site_structure: dict, edited_content: dict) -> SiteArtifact:
+    return build_site_artifact(BUSINESS_NAME, edited_content, site_structure, SCHEMA_SCRIPT)
+
+
+STRATEGIES = {"format": assemble_format, "jinja": assemble_jinja, "shell": assemble_shell}
+
+
+def benchmark_strategy(assemble, site_structure: dict, edited_content: dict, repeat: int) -> float:
+    """Returns the mean milliseconds to assemble the whole site."""
+    assemble(site_structure, edited_content)  # Warm-up: compiles and caches the template.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        assemble(site_structure, edited_content)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generated-site assembly.")
+    parser.add_argument("--service-pages", default="1,100,500", help="Comma-separated service page counts.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--content-kib", type=int, default=4, help="Approximate size of each page body.")
+    args = parser.parse_args()
+
+    print(f"--- Site assembly benchmark: {args.repeat} runs each, ~{args.content_kib} KiB of content per page ---")
+    for count in (int(value) for value in args.service_pages.split(",") if value.strip()):
+        site_structure, edited_content = build_site(count, args.content_kib)
+        pages = len(site_structure)
+        print(f"  {pages} pages")
+        for name, assemble in STRATEGIES.items():
+            site_ms = benchmark_strategy(assemble, site_structure, edited_content, args.repeat)
+            print(f"    {name:<7} {site_ms:9.2f} ms/site   {site_ms / pages * 1000:8.1f} us/page")
+
+
+if __name__ == '__main__':
+    main()